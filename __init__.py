@@ -20,4 +20,4 @@ from .config import RaftConfig, ClusterConfig
 from .message import Message, MessageType, LogEntry
 from .transport import TCPTransport
 from .node import RaftNode, NodeState
-from .metrics import MetricsCollector
+from .metrics import MetricsCollector, METHOD_INSTANT, METHOD_VOTING
@@ -10,8 +10,25 @@ AWS EC2 네트워크 특성:
 - 다른 리전 간 지연: 50-200ms
 """
 
+import bisect
 import json
 import os
+from types import SimpleNamespace
+
+try:
+    import orjson  # 선택 의존성 (설정 저장 가속)
+except ImportError:
+    orjson = None
+
+
+def _dump_json(obj, filepath):
+    """JSON 파일 저장 (orjson이 있으면 사용, 출력 형식은 동일하게 2칸 들여쓰기)"""
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, 'w') as f:
+            json.dump(obj, f, indent=2)
 
 
 class RaftConfig:
@@ -49,10 +66,25 @@ class RaftConfig:
         self.connection_timeout = 5.0  # 연결 타임아웃 (5초)
         self.connection_retry_time = 3.0  # 연결 재시도 시간 (3초)
         self.recv_timeout = 0.01  # 수신 타임아웃 (10ms)
+        self.wire_format = 'json'  # 메시지 직렬화 포맷 ('json' 또는 'msgpack')
+        self.max_message_bytes = 10 * 1024 * 1024  # 수신 프레임 크기 상한 (넘는 길이 헤더를 보낸 연결은 닫음)
+        self.heartbeat_disconnect_timeout = self.follower_timeout_max  # 마지막 ACK 이후 이 시간(초) 응답 없는 팔로워는 재연결 (0이면 비활성)
+
+        # ===== 소켓 옵션 (TCPTransport가 모든 피어 소켓에 적용) =====
+        self.tcp_nodelay = True  # Nagle 비활성화 (작은 하트비트 지연 제거)
+        self.tcp_quickack = True  # 지연 ACK 비활성화 (Linux)
+        self.so_sndbuf = 0  # 송신 버퍼 크기 (0이면 OS 기본값/자동 튜닝 유지, 예: 64*1024)
+        self.so_rcvbuf = 0  # 수신 버퍼 크기 (0이면 OS 기본값/자동 튜닝 유지, 예: 64*1024)
+        self.socket_buffer_bytes = 0  # so_sndbuf/so_rcvbuf가 0일 때 둘 다에 적용 (대량 로그 복제 시 예: 4*1024*1024)
+        self.tcp_user_timeout_ms = int(self.follower_timeout_max * 1000)  # 미확인 전송 허용 시간 (Linux, 0이면 비활성)
 
         # ===== 성능 튜닝 =====
         self.rtt_alpha = 0.3  # RTT EMA 가중치
+        self.rtt_timeout_multiplier = 10.0  # Primary 최소 타임아웃 ≥ RTT × 배수 (10-20배 권장)
+        self.rtt_tail_k = 4.0  # 타임아웃 기준 RTT = EMA + k × 평균 편차 (꼬리 지연 추정)
         self.auto_tick_period = 0.001  # 자동 틱 주기 (1ms)
+        self.max_in_flight = 2  # 팔로워별 응답 대기 중인 엔트리 전송 상한 (넘으면 하트비트만)
+        self.max_batch_entries = 100  # AppendEntries 한 번에 보내는 최대 엔트리 수 (0이면 제한 없음)
 
         # ===== 시뮬레이션 설정 =====
         self.simulation_duration = 60.0  # 시뮬레이션 실행 시간 (초)
@@ -69,12 +101,38 @@ class RaftConfig:
         if node_count < 3:
             raise ValueError("S-Raft는 최소 3개 노드가 필요합니다")
 
-        subleader_count = int(node_count * self.subleader_ratio)
+        subleader_count = self.subleader_count(node_count)
         if subleader_count < 1:
             raise ValueError("서브리더가 최소 1개 이상이어야 합니다")
 
+        if self.wire_format not in ('json', 'msgpack'):
+            raise ValueError(f"지원하지 않는 wire_format: {self.wire_format}")
+
         return True
 
+    def subleader_count(self, node_count):
+        """클러스터 크기에 따른 서브리더 수 (노드는 생성 시 한 번만 호출)"""
+        return int(node_count * self.subleader_ratio)
+
+    def scaled(self, rtt):
+        """
+        RTT 기반 선거 타임아웃 계산
+
+        Primary 최소 타임아웃이 rtt × rtt_timeout_multiplier 이상이 되도록
+        모든 타임아웃 범위를 같은 비율로 늘림 (Primary < Secondary < Follower 순서 유지).
+        RTT가 작으면(같은 VPC/AZ) 설정값을 그대로 사용.
+        """
+        factor = max(1.0, self.rtt_timeout_multiplier * rtt / self.primary_timeout_min)
+        return SimpleNamespace(
+            election_timeout_base=self.election_timeout_base * factor,
+            primary_timeout_min=self.primary_timeout_min * factor,
+            primary_timeout_max=self.primary_timeout_max * factor,
+            secondary_timeout_min=self.secondary_timeout_min * factor,
+            secondary_timeout_max=self.secondary_timeout_max * factor,
+            follower_timeout_min=self.follower_timeout_min * factor,
+            follower_timeout_max=self.follower_timeout_max * factor,
+        )
+
     def to_dict(self):
         """설정을 딕셔너리로 변환"""
         return {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
@@ -90,8 +148,7 @@ class RaftConfig:
 
     def save(self, filepath):
         """설정 저장"""
-        with open(filepath, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        _dump_json(self.to_dict(), filepath)
 
     @classmethod
     def load(cls, filepath):
@@ -114,34 +171,54 @@ class ClusterConfig:
         """
         self.nodes = nodes or []
 
+        # 조회용 인덱스 (node_id → address, address → node_id)
+        # _addresses는 추가 순서와 관계없이 항상 노드 ID 순서 (_ids와 같은 위치)
+        self._by_id = {}
+        self._by_address = {}
+        self._ids = []
+        self._addresses = []
+        for node in self.nodes:
+            self._index_node(node)
+
+    def _index_node(self, node):
+        """노드를 조회 인덱스에 등록 (파일/호출 순서가 달라도 ID 순서 위치에 삽입)"""
+        self._by_id[node['id']] = node['address']
+        self._by_address[node['address']] = node['id']
+        pos = bisect.bisect(self._ids, node['id'])
+        self._ids.insert(pos, node['id'])
+        self._addresses.insert(pos, node['address'])
+
     def add_node(self, node_id, host, port):
         """노드 추가"""
-        self.nodes.append({
+        node = {
             'id': node_id,
             'host': host,
             'port': port,
             'address': f"{host}:{port}"
-        })
+        }
+        self.nodes.append(node)
+        self._index_node(node)
 
     def get_node_address(self, node_id):
         """노드 주소 반환"""
-        for node in self.nodes:
-            if node['id'] == node_id:
-                return node['address']
-        return None
+        return self._by_id.get(node_id)
+
+    def get_node_id(self, address):
+        """주소에 해당하는 노드 ID 반환"""
+        return self._by_address.get(address)
 
     def get_all_addresses(self):
-        """모든 노드 주소 리스트 반환"""
-        return [node['address'] for node in self.nodes]
+        """모든 노드 주소 리스트 반환 (노드 ID 순서)"""
+        return list(self._addresses)
 
     def get_peer_addresses(self, my_id):
         """자신을 제외한 피어 주소 리스트 반환"""
-        return [node['address'] for node in self.nodes if node['id'] != my_id]
+        my_addr = self._by_id.get(my_id)
+        return [addr for addr in self._addresses if addr != my_addr]
 
     def save(self, filepath):
         """클러스터 설정 저장"""
-        with open(filepath, 'w') as f:
-            json.dump({'nodes': self.nodes}, f, indent=2)
+        _dump_json({'nodes': self.nodes}, filepath)
 
     @classmethod
     def load(cls, filepath):
@@ -155,6 +232,9 @@ class ClusterConfig:
         """
         주소 리스트에서 클러스터 설정 생성
 
+        주소를 한 번만 정렬해 노드 ID를 부여한다. 서버와 TCPTransport는
+        get_all_addresses() 결과를 그대로 공유해서 ID 순서가 어긋나지 않게 한다.
+
         Args:
             addresses: ['ip1:port1', 'ip2:port2', ...]
         """
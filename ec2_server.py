@@ -16,9 +16,9 @@ AWS EC2에서 실행되는 S-Raft 노드 서버
 """
 
 import argparse
+import array
 import os
-import sys
-import time
+import queue
 import signal
 import threading
 import json
@@ -65,15 +65,15 @@ class EC2RaftServer:
 
         # 전송 계층
         print(f"[Server] Initializing transport...")
-        self.transport = TCPTransport(self_addr, all_addrs, self.config)
+        sorted_addrs = self.cluster.get_all_addresses()
+        self.transport = TCPTransport(self_addr, sorted_addrs, self.config, presorted=True)
 
         # Raft 노드
-        total_nodes = len(all_addrs)
+        total_nodes = len(sorted_addrs)
         self.config.validate(total_nodes)
 
-        # 노드 ID 재계산 (주소 정렬 기반)
-        sorted_addrs = sorted(all_addrs)
-        actual_node_id = sorted_addrs.index(self_addr)
+        # 노드 ID 재계산 (ClusterConfig의 정렬 순서 기반)
+        actual_node_id = self.cluster.get_node_id(self_addr)
 
         print(f"[Server] Creating Raft node {actual_node_id}...")
         self.node = RaftNode(
@@ -87,32 +87,70 @@ class EC2RaftServer:
         # 콜백 설정
         self.node.on_become_leader = self._on_become_leader
         self.node.on_become_follower = self._on_become_follower
-        self.node.on_log_committed = self._on_log_committed
+        self.node.on_log_committed_batch = self._on_log_committed_batch
 
         # 상태
         self.running = False
         self.node_thread = None
+        self._shutdown = threading.Event()  # 종료 요청 시 set
+        self.status_version = 0  # 리더/팔로워 전환, 커밋 시 증가
 
         # 애플리케이션 상태 (예: 카운터)
-        self.app_state = {'counter': 0}
-        self.app_lock = threading.Lock()
+        # 쓰기는 적용 워커 스레드에서만 일어나므로 락 없이 단일 슬롯에 기록
+        self.app_counter = array.array('q', [0])
+
+        # 커밋된 엔트리 적용 큐 (노드 스레드는 넣기만 하고 바로 복귀)
+        self._apply_q = queue.SimpleQueue()
+        self._apply_thread = None
 
     def _on_become_leader(self):
         """리더가 됐을 때 콜백"""
+        self.status_version += 1
         print(f"[Server] This node is now the LEADER")
 
     def _on_become_follower(self):
         """Follower가 됐을 때 콜백"""
+        self.status_version += 1
         print(f"[Server] This node is now a Follower")
 
-    def _on_log_committed(self, entry):
-        """로그가 커밋됐을 때 콜백"""
-        with self.app_lock:
-            command = entry.command
-            if command.get('type') == 'increment':
-                self.app_state['counter'] += command.get('value', 1)
-            elif command.get('type') == 'set':
-                self.app_state['counter'] = command.get('value', 0)
+    def _on_log_committed_batch(self, entries):
+        """로그가 커밋됐을 때 콜백 (적용은 워커 스레드에 넘김)"""
+        self.status_version += 1
+        self._apply_q.put(entries)
+
+    def _apply_worker(self):
+        """
+        커밋된 엔트리 적용 워커
+
+        큐에 쌓인 배치를 한 번에 꺼내 연속된 increment를 하나의 덧셈으로 합친다.
+        None을 받으면 남은 배치까지 적용하고 종료.
+        """
+        apply_q = self._apply_q
+        counter = self.app_counter
+        while True:
+            batches = [apply_q.get()]
+            while True:
+                try:
+                    batches.append(apply_q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            value = counter[0]
+            for entries in batches:
+                if entries is None:
+                    stop = True
+                    continue
+                for entry in entries:
+                    command = entry.command
+                    if command.get('type') == 'increment':
+                        value += command.get('value', 1)
+                    elif command.get('type') == 'set':
+                        value = command.get('value', 0)
+            counter[0] = value
+
+            if stop:
+                return
 
     def start(self):
         """서버 시작"""
@@ -121,6 +159,10 @@ class EC2RaftServer:
 
         self.running = True
 
+        # 적용 워커 시작
+        self._apply_thread = threading.Thread(target=self._apply_worker, daemon=True)
+        self._apply_thread.start()
+
         # Raft 노드 스레드 시작
         self.node_thread = threading.Thread(target=self.node.run, daemon=True)
         self.node_thread.start()
@@ -135,9 +177,14 @@ class EC2RaftServer:
 
         print(f"[Server] Stopping...")
         self.running = False
+        self._shutdown.set()
         self.node.stop()
         self.transport.stop()
 
+        # 적용 워커 종료 (남은 엔트리 적용 후)
+        self._apply_q.put(None)
+        self._apply_thread.join(timeout=1.0)
+
         # 메트릭 출력
         self.metrics.print_summary()
 
@@ -146,7 +193,7 @@ class EC2RaftServer:
         node_state = self.node.get_state()
         return {
             **node_state,
-            'app_state': self.app_state.copy(),
+            'app_state': {'counter': self.app_counter[0]},
             'transport_stats': self.transport.get_stats()
         }
 
@@ -159,22 +206,38 @@ class EC2RaftServer:
 
     def get_counter(self):
         """카운터 값 반환"""
-        with self.app_lock:
-            return self.app_state['counter']
+        return self.app_counter[0]
 
 
-def get_ec2_private_ip():
-    """EC2 인스턴스의 프라이빗 IP 조회 (메타데이터 서비스)"""
-    try:
-        # EC2 메타데이터 서비스에서 프라이빗 IP 조회
-        url = "http://169.254.169.254/latest/meta-data/local-ipv4"
-        req = urllib.request.Request(url)
-        req.add_header('X-aws-ec2-metadata-token-ttl-seconds', '21600')
+# EC2 메타데이터(IMDS) 응답 대기 시간 (EC2에서는 1ms 미만, EC2 밖에서는 빠르게 폴백)
+_IMDS_TIMEOUT = 0.2
+
+# IMDS 성공 응답 캐시 (url → 값). 실패/폴백 값은 캐시하지 않아 다음 호출에서 다시 조회
+_imds_cache = {}
+
 
-        with urllib.request.urlopen(req, timeout=2) as response:
-            return response.read().decode('utf-8')
+def _imds_get(url, headers=None):
+    """IMDS 조회 (성공한 응답만 캐시, 실패하면 None)"""
+    value = _imds_cache.get(url)
+    if value is not None:
+        return value
+    try:
+        req = urllib.request.Request(url, headers=headers or {})
+        with urllib.request.urlopen(req, timeout=_IMDS_TIMEOUT) as response:
+            value = response.read().decode('utf-8')
     except:
-        pass
+        return None
+    _imds_cache[url] = value
+    return value
+
+
+def get_ec2_private_ip():
+    """EC2 인스턴스의 프라이빗 IP 조회 (메타데이터 서비스, 성공한 결과만 캐시)"""
+    # EC2 메타데이터 서비스에서 프라이빗 IP 조회
+    ip = _imds_get("http://169.254.169.254/latest/meta-data/local-ipv4",
+                   {'X-aws-ec2-metadata-token-ttl-seconds': '21600'})
+    if ip is not None:
+        return ip
 
     # 폴백: 소켓으로 로컬 IP 얻기
     try:
@@ -188,13 +251,9 @@ def get_ec2_private_ip():
 
 
 def get_ec2_instance_id():
-    """EC2 인스턴스 ID 조회"""
-    try:
-        url = "http://169.254.169.254/latest/meta-data/instance-id"
-        with urllib.request.urlopen(url, timeout=2) as response:
-            return response.read().decode('utf-8')
-    except:
-        return "unknown"
+    """EC2 인스턴스 ID 조회 (성공한 결과만 캐시)"""
+    instance_id = _imds_get("http://169.254.169.254/latest/meta-data/instance-id")
+    return instance_id if instance_id is not None else "unknown"
 
 
 def main():
@@ -258,16 +317,11 @@ def main():
     # 서버 생성 및 시작
     server = EC2RaftServer(node_id, host, port, peer_addresses, config)
 
-    # 시그널 핸들러
-    def signal_handler(sig, frame):
-        print(f"\n[Server] Received signal {sig}, shutting down...")
-        server.stop()
-
-        # 메트릭 저장
-        if args.metrics_file:
-            server.metrics.export_json(args.metrics_file)
+    # 시그널 핸들러: 종료 플래그만 세팅하고 정리 작업은 메인 스레드에서 수행
+    shutdown_event = server._shutdown
 
-        sys.exit(0)
+    def signal_handler(sig, frame):
+        shutdown_event.set()
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -275,10 +329,14 @@ def main():
     # 시작
     server.start()
 
-    # 상태 모니터링 루프
+    # 상태 모니터링 루프 (변경이 있을 때만 상태 조회/출력)
+    last_seen = None
     try:
-        while server.running:
-            time.sleep(5)
+        while not shutdown_event.wait(5):
+            seen = (server.status_version, tuple(server.node.get_state().items()))
+            if seen == last_seen:
+                continue
+            last_seen = seen
 
             status = server.get_status()
             leader_str = f"LEADER" if status['state'] == 'Leader' else f"Follower (leader={status['leader_id']})"
@@ -295,11 +353,12 @@ def main():
     except KeyboardInterrupt:
         pass
     finally:
+        print(f"\n[Server] Shutting down...")
         server.stop()
 
+        # 메트릭 저장
         if args.metrics_file:
             server.metrics.export_json(args.metrics_file)
 
-
 if __name__ == '__main__':
     main()
@@ -13,7 +13,7 @@ import time
 import threading
 import signal
 
-from config import RaftConfig
+from config import RaftConfig, ClusterConfig
 from transport import TCPTransport
 from node import RaftNode, NodeState
 from metrics import MetricsCollector
@@ -39,8 +39,10 @@ class LocalCluster:
         # 메트릭
         self.metrics = MetricsCollector()
 
-        # 주소 생성
-        self.addresses = [f"127.0.0.1:{base_port + i}" for i in range(num_nodes)]
+        # 주소 생성 (ClusterConfig 정렬 순서 = 노드 ID 순서)
+        self.cluster = ClusterConfig.from_addresses(
+            [f"127.0.0.1:{base_port + i}" for i in range(num_nodes)])
+        self.addresses = self.cluster.get_all_addresses()
 
         self.running = False
 
@@ -60,14 +62,14 @@ class LocalCluster:
             print(f"\n[Cluster] Starting Node {i} ({self_addr})...")
 
             # Transport 생성
-            transport = TCPTransport(self_addr, self.addresses, self.config)
+            transport = TCPTransport(self_addr, self.addresses, self.config, presorted=True)
             self.transports.append(transport)
 
             # Raft 노드 생성
             node = RaftNode(i, self.num_nodes, self.config, transport, self.metrics)
             self.nodes.append(node)
 
-            # 노드 스레드 시작
+            # 노드 스레드 시작 (run()이 다음 타이머 마감까지만 대기하므로 별도 틱 스레드 없음)
             thread = threading.Thread(target=node.run, daemon=True)
             thread.start()
             self.threads.append(thread)
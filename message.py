@@ -5,9 +5,35 @@ S-Raft Message Protocol
 노드 간 TCP 통신을 위한 메시지 정의
 """
 
+import sys
 import time
 import json
 import struct
+from collections import deque
+
+try:
+    import msgpack  # 선택 의존성 (config.wire_format = 'msgpack')
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson  # 선택 의존성 (JSON 인코딩/디코딩 가속, 와이어 포맷은 동일)
+except ImportError:
+    orjson = None
+
+
+# 길이 헤더 (4바이트 빅 엔디안), 포맷 파싱을 한 번만 하도록 미리 컴파일
+_HDR = struct.Struct('>I')
+
+# 미리 생성한 JSON 인코더 (공백 없는 구분자, 순환 참조 검사 생략)
+_json_encode = json.JSONEncoder(separators=(',', ':'), check_circular=False).encode
+
+
+def _json_dumps(d):
+    """JSON 바이트 인코딩 (orjson이 있으면 사용, 명령의 int 키는 json처럼 문자열로)"""
+    if orjson is not None:
+        return orjson.dumps(d, option=orjson.OPT_NON_STR_KEYS)
+    return _json_encode(d).encode('utf-8')
 
 
 class MessageType:
@@ -20,9 +46,23 @@ class MessageType:
     CLIENT_RESPONSE = 'ClientResponse'
 
 
+# 위치 기반 인코딩(msgpack)에서 타입 이름 대신 보내는 번호 (순서 변경 시 와이어 호환 깨짐)
+_TYPE_NAMES = (
+    MessageType.APPEND_ENTRIES,
+    MessageType.APPEND_ACK,
+    MessageType.REQUEST_VOTE,
+    MessageType.VOTE_RESPONSE,
+    MessageType.CLIENT_REQUEST,
+    MessageType.CLIENT_RESPONSE,
+)
+_TYPE_IDS = {name: i for i, name in enumerate(_TYPE_NAMES)}
+
+
 class LogEntry:
     """로그 엔트리 클래스"""
 
+    __slots__ = ('term', 'command', 'index')
+
     def __init__(self, term, command, index=0):
         self.term = term
         self.command = command
@@ -46,112 +86,323 @@ class Message:
 
     프로토콜:
     - 4 bytes: 메시지 길이 (빅 엔디안)
-    - N bytes: JSON 인코딩된 메시지 데이터
+    - N bytes: JSON 또는 msgpack 인코딩된 메시지 데이터 (wire_format)
     """
 
+    # 인스턴스 __dict__ 없이 고정 필드만 (메시지마다 dict 할당 제거, 객체 크기 축소)
+    __slots__ = ('type', 'sender_id', 'term', 'data', 'timestamp',
+                 '_message_id', 'heartbeat', '_frame')
+
+    # 재사용 Message 풀 (acquire/release, deque 연산은 스레드 안전)
+    _pool = deque(maxlen=256)
+
+    # 하트비트 인코딩 캐시 (단일 슬롯: (signature, frame))
+    # 리더는 같은 하트비트를 모든 피어에게 반복 전송하므로 재직렬화를 생략
+    _heartbeat_cache = None
+
     def __init__(self, msg_type, sender_id, term, data=None):
         self.type = msg_type
         self.sender_id = sender_id
         self.term = term
         self.data = data if data else {}
-        self.timestamp = time.time()
-        self.message_id = f"{sender_id}_{int(self.timestamp * 1000000)}"
+        self.timestamp = time.time()  # 생성 시각 (wall-clock 초, 와이어로 전송. RTT는 노드가 monotonic으로 따로 측정)
+        self._message_id = None  # 필요할 때만 생성 (로깅/메트릭용)
+        self.heartbeat = False  # 빈 AppendEntries 여부 (인코딩 캐시 사용)
+        self._frame = None  # 인코딩 캐시 (wire_format, frame): 여러 피어에 보낼 때 한 번만 직렬화
+
+    @classmethod
+    def acquire(cls, msg_type, sender_id, term, data=None):
+        """풀에서 Message를 꺼내 재초기화 (풀이 비었으면 새로 생성)"""
+        try:
+            msg = cls._pool.pop()
+        except IndexError:
+            return cls(msg_type, sender_id, term, data)
+        msg.__init__(msg_type, sender_id, term, data)
+        return msg
+
+    @classmethod
+    def release(cls, msg):
+        """
+        Message를 풀에 반환
+
+        반환 후에는 msg를 참조하지 않아야 함. data dict는 재초기화 시
+        교체될 뿐 수정되지 않으므로, data를 따로 보관하는 것은 안전.
+        """
+        cls._pool.append(msg)
+
+    @property
+    def message_id(self):
+        """메시지 ID (첫 접근 시 생성)"""
+        if self._message_id is None:
+            self._message_id = f"{self.sender_id}_{int(self.timestamp * 1000000)}"
+        return self._message_id
+
+    @message_id.setter
+    def message_id(self, value):
+        self._message_id = value
+        self._frame = None
 
     def to_dict(self):
         """딕셔너리로 변환"""
-        return {
+        d = {
             'type': self.type,
             'sender_id': self.sender_id,
             'term': self.term,
             'data': self._serialize_data(self.data),
-            'timestamp': self.timestamp,
-            'message_id': self.message_id
+            'timestamp': self.timestamp
         }
+        # message_id는 이미 생성된 경우에만 전송
+        if self._message_id is not None:
+            d['message_id'] = self._message_id
+        return d
 
     def _serialize_data(self, data):
-        """데이터 직렬화 (LogEntry 처리)"""
-        if isinstance(data, dict):
-            result = {}
-            for k, v in data.items():
-                if k == 'entries' and isinstance(v, list):
-                    result[k] = [
-                        e.to_dict() if isinstance(e, LogEntry) else e
-                        for e in v
-                    ]
-                else:
-                    result[k] = v
-            return result
+        """데이터 직렬화 (메시지 타입별 고정 스키마)"""
+        if self.type == MessageType.APPEND_ENTRIES:
+            return _encode_append_entries(data)
+        # AppendAck/RequestVote/VoteResponse 등은 스칼라 필드뿐이므로 그대로 사용
+        return data
+
+    def to_tuple(self):
+        """
+        위치 기반 표현으로 변환 (msgpack 와이어 포맷)
+
+        (타입 번호, sender_id, term, 필드, timestamp, message_id) 순서로
+        키 문자열 없이 보낸다. 필드도 타입별 고정 순서의 배열.
+        """
+        return (_TYPE_IDS[self.type], self.sender_id, self.term,
+                self._pack_fields(), self.timestamp, self._message_id)
+
+    def _pack_fields(self):
+        """타입별 필드를 고정 순서 배열로 (클라이언트 메시지는 dict 그대로)"""
+        msg_type = self.type
+        data = self.data
+        if msg_type == MessageType.APPEND_ENTRIES:
+            return (data['prev_log_index'], data['prev_log_term'],
+                    [(e.term, e.index, e.command) for e in data['entries']],
+                    data['leader_commit'], data['sub_leaders'], data.get('rtt', 0.0))
+        if msg_type == MessageType.APPEND_ACK:
+            return (data['success'], data['match_index'])
+        if msg_type == MessageType.REQUEST_VOTE:
+            return (data['last_log_index'], data['last_log_term'])
+        if msg_type == MessageType.VOTE_RESPONSE:
+            return (data['vote_granted'],)
         return data
 
+    @classmethod
+    def from_tuple(cls, t):
+        """to_tuple의 역변환"""
+        type_id, sender_id, term, fields, timestamp, message_id = t
+        msg_type = _TYPE_NAMES[type_id]
+        msg = cls.acquire(msg_type, sender_id, term, cls._unpack_fields(msg_type, fields))
+        msg.timestamp = timestamp
+        msg._message_id = message_id
+        return msg
+
+    @classmethod
+    def _unpack_fields(cls, msg_type, fields):
+        """_pack_fields의 역변환"""
+        if msg_type == MessageType.APPEND_ENTRIES:
+            prev_index, prev_term, entries, commit, sub_leaders, rtt = fields
+            return {
+                'prev_log_index': prev_index,
+                'prev_log_term': prev_term,
+                'entries': [LogEntry(term, command, index) for term, index, command in entries],
+                'leader_commit': commit,
+                'sub_leaders': sub_leaders,
+                'rtt': rtt
+            }
+        if msg_type == MessageType.APPEND_ACK:
+            return {'success': fields[0], 'match_index': fields[1]}
+        if msg_type == MessageType.REQUEST_VOTE:
+            return {'last_log_index': fields[0], 'last_log_term': fields[1]}
+        if msg_type == MessageType.VOTE_RESPONSE:
+            return {'vote_granted': fields[0]}
+        return fields
+
     @classmethod
     def from_dict(cls, d):
         """딕셔너리에서 생성"""
-        msg = cls(
-            d['type'],
+        # JSON 디코딩마다 새로 생기는 타입 문자열을 MessageType 상수와 같은 객체로 맞춤
+        # (핸들러 dict 조회와 타입 비교가 동일 객체 비교로 끝남)
+        msg_type = sys.intern(d['type'])
+        msg = cls.acquire(
+            msg_type,
             d['sender_id'],
             d['term'],
-            cls._deserialize_data(d.get('data', {}))
+            cls._deserialize_data(msg_type, d.get('data', {}))
         )
-        msg.timestamp = d.get('timestamp', time.time())
-        msg.message_id = d.get('message_id', '')
+        msg.timestamp = d.get('timestamp', msg.timestamp)
+        msg._message_id = d.get('message_id')
         return msg
 
     @classmethod
-    def _deserialize_data(cls, data):
-        """데이터 역직렬화 (LogEntry 처리)"""
-        if isinstance(data, dict):
-            result = {}
-            for k, v in data.items():
-                if k == 'entries' and isinstance(v, list):
-                    result[k] = [
-                        LogEntry.from_dict(e) if isinstance(e, dict) and 'term' in e else e
-                        for e in v
-                    ]
-                elif k == 'sub_leaders' and isinstance(v, dict):
-                    # JSON은 dict 키를 문자열로 변환하므로, int로 복원
-                    result[k] = {int(node_id): rank for node_id, rank in v.items()}
-                else:
-                    result[k] = v
-            return result
+    def _deserialize_data(cls, msg_type, data):
+        """데이터 역직렬화 (메시지 타입별 고정 스키마)"""
+        if msg_type == MessageType.APPEND_ENTRIES:
+            return _decode_append_entries(data)
         return data
 
-    def encode(self):
-        """바이트로 인코딩"""
-        json_data = json.dumps(self.to_dict()).encode('utf-8')
-        length = len(json_data)
-        return struct.pack('>I', length) + json_data
+    def encode(self, wire_format='json'):
+        """
+        바이트로 인코딩 (길이 헤더 포함)
+
+        결과는 메시지에 캐시되어 같은 메시지를 여러 피어에 보낼 때 재사용된다.
+        메시지는 생성 후 수정하지 않는다고 가정 (풀 재초기화 시 캐시도 초기화).
+        """
+        if self.heartbeat:
+            return self._encode_heartbeat(wire_format)
+        cached = self._frame
+        if cached is not None and cached[0] == wire_format:
+            return cached[1]
+        body = self.encode_payload(wire_format)
+        frame = _HDR.pack(len(body)) + body
+        self._frame = (wire_format, frame)
+        return frame
+
+    def encode_parts(self, wire_format='json'):
+        """
+        (길이 헤더, 페이로드) 쌍으로 인코딩 (캐시 없음)
+
+        큰 페이로드에 헤더를 붙이느라 전체를 복사하지 않도록 transport가
+        sendmsg로 두 버퍼를 그대로 전송할 때 사용.
+        """
+        body = self.encode_payload(wire_format)
+        return _HDR.pack(len(body)), body
+
+    def _encode_heartbeat(self, wire_format):
+        """
+        하트비트 인코딩 (캐시 사용)
+
+        term, 로그 위치, commit, 서브리더가 같으면 이전 프레임을 재사용.
+        timestamp/message_id는 첫 인코딩 시점 값이 유지됨 (로깅 용도).
+        """
+        data = self.data
+        signature = (
+            wire_format, self.sender_id, self.term,
+            data.get('prev_log_index'), data.get('prev_log_term'),
+            data.get('leader_commit'), data.get('rtt'),
+            tuple(data.get('sub_leaders', ()))
+        )
+        cached = Message._heartbeat_cache
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        body = self.encode_payload(wire_format)
+        frame = _HDR.pack(len(body)) + body
+        Message._heartbeat_cache = (signature, frame)
+        return frame
+
+    def encode_payload(self, wire_format='json'):
+        """페이로드만 인코딩 (길이 헤더 제외, msgpack은 위치 기반 to_tuple)"""
+        if wire_format == 'msgpack':
+            _require_msgpack()
+            return msgpack.packb(self.to_tuple(), use_bin_type=True)
+        if self.type == MessageType.APPEND_ENTRIES:
+            # 핫패스: to_dict/_serialize_data 분기 없이 바로 구성
+            d = {
+                'type': MessageType.APPEND_ENTRIES,
+                'sender_id': self.sender_id,
+                'term': self.term,
+                'data': _encode_append_entries(self.data),
+                'timestamp': self.timestamp
+            }
+            if self._message_id is not None:
+                d['message_id'] = self._message_id
+        else:
+            d = self.to_dict()
+        return _json_dumps(d)
 
     @classmethod
-    def decode(cls, data):
-        """바이트에서 디코딩"""
-        if len(data) < 4:
+    def decode(cls, data, wire_format='json'):
+        """바이트에서 디코딩 (memoryview로 슬라이스 복사 없이)"""
+        mv = memoryview(data)
+        size = _HDR.size
+        if len(mv) < size:
             return None
-        length = struct.unpack('>I', data[:4])[0]
-        if len(data) < 4 + length:
+        length = _HDR.unpack_from(mv, 0)[0]
+        if len(mv) < size + length:
             return None
-        json_data = data[4:4 + length].decode('utf-8')
-        return cls.from_dict(json.loads(json_data))
+        return cls.decode_payload(mv[size:size + length], wire_format)
+
+    @classmethod
+    def decode_payload(cls, payload, wire_format='json'):
+        """페이로드(길이 헤더 제외)에서 디코딩 (bytes, bytearray, memoryview)"""
+        if wire_format == 'msgpack':
+            _require_msgpack()
+            # msgpack은 버퍼를 직접 읽음. 클라이언트 명령의 int 키는 그대로 유지
+            return cls.from_tuple(msgpack.unpackb(payload, raw=False, strict_map_key=False))
+        if orjson is not None:
+            # orjson은 bytes/bytearray/memoryview를 복사 없이 바로 읽음
+            return cls.from_dict(orjson.loads(payload))
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return cls.from_dict(json.loads(payload))
 
     def __repr__(self):
         return f"Message({self.type}, from={self.sender_id}, term={self.term})"
 
 
+def _encode_append_entries(data):
+    """
+    AppendEntries 데이터 인코딩
+
+    고정 필드를 짧은 키로, 엔트리를 (term, index, command) 배열로 직접 변환
+    """
+    return {
+        'p': data['prev_log_index'],
+        't': data['prev_log_term'],
+        'e': [(e.term, e.index, e.command) for e in data['entries']],
+        'c': data['leader_commit'],
+        's': data['sub_leaders'],
+        'r': data.get('rtt', 0.0)
+    }
+
+
+def _decode_append_entries(d):
+    """AppendEntries 데이터 디코딩 (_encode_append_entries의 역변환)"""
+    return {
+        'prev_log_index': d['p'],
+        'prev_log_term': d['t'],
+        'entries': [LogEntry(term, command, index) for term, index, command in d['e']],
+        'leader_commit': d['c'],
+        'sub_leaders': d['s'],  # [[node_id, rank], ...] 그대로 사용 (dict 재구성 없음)
+        'rtt': d.get('r', 0.0)
+    }
+
+
+def _require_msgpack():
+    """msgpack 사용 가능 여부 확인"""
+    if msgpack is None:
+        raise RuntimeError("wire_format='msgpack'을 사용하려면 msgpack 패키지가 필요합니다")
+
+
 # 메시지 생성 헬퍼 함수들
 def create_append_entries(sender_id, term, prev_log_index, prev_log_term,
-                          entries, leader_commit, sub_leaders=None):
-    """AppendEntries 메시지 생성"""
-    return Message(MessageType.APPEND_ENTRIES, sender_id, term, {
+                          entries, leader_commit, sub_leaders=None, rtt=0.0):
+    """
+    AppendEntries 메시지 생성 (rtt: 리더가 측정한 클러스터 RTT 추정치)
+
+    sub_leaders는 rank 순서의 ((node_id, rank), ...) 쌍 목록이다.
+    JSON/msgpack 모두 리스트로 그대로 전송되어 수신 측 키 변환이 필요 없다.
+    """
+    sub_leaders = sub_leaders or ()
+    msg = Message.acquire(MessageType.APPEND_ENTRIES, sender_id, term, {
         'prev_log_index': prev_log_index,
         'prev_log_term': prev_log_term,
         'entries': entries,
         'leader_commit': leader_commit,
-        'sub_leaders': sub_leaders or {}
+        'sub_leaders': sub_leaders,
+        'rtt': rtt
     })
+    if not entries:
+        msg.heartbeat = True
+    return msg
 
 
 def create_append_ack(sender_id, term, success, match_index):
     """AppendAck 메시지 생성"""
-    return Message(MessageType.APPEND_ACK, sender_id, term, {
+    return Message.acquire(MessageType.APPEND_ACK, sender_id, term, {
         'success': success,
         'match_index': match_index
     })
@@ -159,7 +410,7 @@ def create_append_ack(sender_id, term, success, match_index):
 
 def create_request_vote(sender_id, term, last_log_index, last_log_term):
     """RequestVote 메시지 생성"""
-    return Message(MessageType.REQUEST_VOTE, sender_id, term, {
+    return Message.acquire(MessageType.REQUEST_VOTE, sender_id, term, {
         'last_log_index': last_log_index,
         'last_log_term': last_log_term
     })
@@ -167,6 +418,6 @@ def create_request_vote(sender_id, term, last_log_index, last_log_term):
 
 def create_vote_response(sender_id, term, vote_granted):
     """VoteResponse 메시지 생성"""
-    return Message(MessageType.VOTE_RESPONSE, sender_id, term, {
+    return Message.acquire(MessageType.VOTE_RESPONSE, sender_id, term, {
         'vote_granted': vote_granted
     })
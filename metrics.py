@@ -5,13 +5,190 @@ S-Raft Metrics Collection
 성능 메트릭 수집 및 분석
 """
 
+import heapq
+import math
 import threading
 import time
-import statistics
 import json
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
 from datetime import datetime
 
+try:
+    import orjson  # 선택 의존성 (메트릭 내보내기 가속)
+except ImportError:
+    orjson = None
+
+
+# 선거 방식 코드 (record_election_time에 문자열 대신 넘길 수 있음)
+METHOD_INSTANT = 0  # 'instant_promotion'
+METHOD_VOTING = 1  # 'voting'
+
+_METHOD_NAMES = ('instant_promotion', 'voting')  # 코드 → 이름 (내보내기용)
+_METHOD_CODES = {name: code for code, name in enumerate(_METHOD_NAMES)}
+
+
+def _store_election(mc, duration, winner_id, is_sub_leader, code, ts):
+    mc._elect_count[code] += 1
+    mc._elect_sum[code] += duration
+    by_method = mc._elect_dur_by_method[code]
+    by_method.append(duration)
+    if len(by_method) > 2 * mc.max_raw_samples:
+        _trim_columns((by_method,), mc.max_raw_samples)
+    mc._elect_dur.append(duration)
+    mc._elect_winner.append(winner_id)
+    mc._elect_sub.append(1 if is_sub_leader else 0)
+    mc._elect_method.append(code)
+    mc._elect_ts.append(ts)
+    if len(mc._elect_dur) > 2 * mc.max_raw_samples:
+        _trim_columns((mc._elect_dur, mc._elect_winner, mc._elect_sub,
+                       mc._elect_method, mc._elect_ts), mc.max_raw_samples)
+
+
+def _store_latency(mc, latency, success, ts):
+    mc._lat_count += 1
+    mc._lat_sum += latency
+    # Welford 온라인 분산
+    delta = latency - mc._lat_mean
+    mc._lat_mean += delta / mc._lat_count
+    mc._lat_m2 += delta * (latency - mc._lat_mean)
+    if success:
+        mc._lat_success += 1
+    mc._lat_hist[_hist_bucket(latency)] += 1
+    if mc.keep_raw:
+        # 미리 할당한 링 버퍼에 덮어쓰기 (할당/삭제 없음)
+        pos = mc._lat_pos
+        mc._lat_vals[pos] = latency
+        mc._lat_ok[pos] = 1 if success else 0
+        mc._lat_ts[pos] = ts
+        pos += 1
+        if pos == mc.max_raw_samples:
+            pos = 0
+        mc._lat_pos = pos
+        if mc._lat_filled < mc.max_raw_samples:
+            mc._lat_filled += 1
+
+
+def _store_promotion_failure(mc, record):
+    mc._promotion_failure_count += 1
+    mc.promotion_failures.append(record)
+
+
+def _store_leader_failure(mc, record):
+    mc._leader_failure_count += 1
+    mc.leader_failures.append(record)
+
+
+def _store_throughput(mc, node_id, rps, ts):
+    agg = mc._tput_agg[node_id]
+    agg['n'] += 1
+    agg['sum'] += rps
+    if rps > agg['max']:
+        agg['max'] = rps
+    agg['last_ts'] = ts
+    mc.throughput_data[node_id].append({'rps': rps, 'timestamp': ts})
+
+
+def _trim_columns(columns, keep):
+    """
+    컬럼들을 최근 keep개만 남기고 앞쪽 삭제 (링 버퍼 역할)
+
+    상한의 2배가 됐을 때만 호출하므로 삭제 비용은 기록당 O(1)로 분할 상환된다.
+    """
+    for column in columns:
+        del column[:len(column) - keep]
+
+
+# 지연 히스토그램 (HDR 스타일 로그 버킷): 마이크로초 기준 2배 구간마다 16칸
+_HIST_BUCKETS = 2048
+_HIST_SUB = 16
+
+
+def _hist_bucket(latency):
+    """지연(초) → 히스토그램 버킷 인덱스"""
+    us = latency * 1e6
+    if us <= 1.0:
+        return 0
+    return min(_HIST_BUCKETS - 1, int(math.log2(us) * _HIST_SUB))
+
+
+def _hist_percentile(hist, total, percentiles):
+    """
+    히스토그램에서 여러 백분위수를 누적 합 한 번으로 계산
+
+    각 버킷의 로그 중앙값(초)을 반환하므로 상대 오차는 약 ±2.2% 이내 (2^(1/32))
+    """
+    targets = sorted((max(1, math.ceil(total * p / 100)), i)
+                     for i, p in enumerate(percentiles))
+    result = [0.0] * len(percentiles)
+    cum = 0
+    t = 0
+    for bucket, count in enumerate(hist):
+        if not count:
+            continue
+        cum += count
+        while t < len(targets) and cum >= targets[t][0]:
+            result[targets[t][1]] = 2 ** ((bucket + 0.5) / _HIST_SUB) / 1e6
+            t += 1
+        if t == len(targets):
+            break
+    return result
+
+
+def _multi_percentile(values, percentiles):
+    """
+    여러 백분위수를 한 번의 선택/정렬로 계산 (선형 보간, p50은 중앙값과 동일)
+
+    요청한 백분위가 모두 상위 꼬리(p99 등)라 필요한 원소가 전체의 1/8 이하이면
+    전체 정렬 대신 heapq.nlargest로 상위 k개만 고른다.
+
+    Args:
+        values: 숫자 시퀀스 (비어 있지 않아야 함)
+        percentiles: 0~100 백분위 목록 (예: (50, 95, 99))
+    """
+    n = len(values)
+    last = n - 1
+    positions = [last * p / 100 for p in percentiles]
+    k = n - int(min(positions))  # 필요한 상위 원소 수 (최저 위치부터 끝까지)
+
+    if k * 8 <= n:
+        top = heapq.nlargest(k, values)  # 내림차순: 오름차순 인덱스 i → top[last - i]
+        def at(i):
+            return top[last - i]
+    else:
+        ordered = sorted(values)
+        at = ordered.__getitem__
+
+    result = []
+    for pos in positions:
+        lo = int(pos)
+        hi = min(lo + 1, last)
+        low = at(lo)
+        result.append(low + (at(hi) - low) * (pos - lo))
+    return result
+
+
+def _election_records(columns):
+    """선거 컬럼 스냅샷 → dict 리스트"""
+    return [
+        {
+            'duration': duration,
+            'winner': winner,
+            'is_sub_leader': bool(is_sub),
+            'method': _METHOD_NAMES[method],
+            'timestamp': ts / 1e9
+        }
+        for duration, winner, is_sub, method, ts in zip(*columns)
+    ]
+
+
+def _latency_records(columns):
+    """지연 컬럼 스냅샷 → dict 리스트"""
+    return [
+        {'latency': latency, 'success': bool(ok), 'timestamp': ts / 1e9}
+        for latency, ok, ts in zip(*columns)
+    ]
+
 
 class MetricsCollector:
     """
@@ -22,121 +199,338 @@ class MetricsCollector:
     - 클라이언트 요청 지연
     - 처리량 (throughput)
     - 리더 장애 횟수
+
+    선거 시간과 요청 지연은 레코드마다 dict를 만들지 않고 필드별 array
+    컬럼(SoA)에 저장한다. election_times/request_latencies 속성은 내보내기용으로
+    dict 리스트를 재구성해서 반환.
+
+    요청 지연은 항상 고정 크기 로그 히스토그램에 누적되므로 장시간 실행에도
+    메모리가 늘지 않는다. 원본 샘플은 keep_raw=True일 때만 보관하며, 원본이
+    전체 샘플을 담고 있으면 정확한 백분위수를, 아니면 히스토그램 근사값을 쓴다.
+    원본 기록(선거/지연/장애)은 최근 max_raw_samples개 수준으로 제한되고,
+    횟수와 평균은 별도 누적값으로 계산하므로 잘려도 정확하다.
     """
 
-    def __init__(self):
-        self.election_times = []
-        self.request_latencies = []
-        self.leader_failures = []
-        self.throughput_data = defaultdict(list)
+    def __init__(self, keep_raw=True, max_raw_samples=10000):
+        """
+        Args:
+            keep_raw: 요청 지연 원본 샘플 보관 여부 (내보내기/정확한 백분위수용)
+            max_raw_samples: 원본 기록 보관 상한 (최근 것만 유지, 통계는 전체 기준)
+        """
+        self.keep_raw = keep_raw
+        self.max_raw_samples = max_raw_samples
+
+        # 선거/승격 시간 컬럼
+        self._elect_dur = array('d')
+        self._elect_winner = array('i')
+        self._elect_sub = array('B')
+        self._elect_method = array('B')  # _METHOD_NAMES 인덱스
+        self._elect_ts = array('q')  # 시작 이후 경과 ns
+        self._elect_count = [0] * len(_METHOD_NAMES)  # 방식별 횟수
+        self._elect_sum = [0.0] * len(_METHOD_NAMES)  # 방식별 소요 시간 합
+        self._elect_dur_by_method = [array('d') for _ in _METHOD_NAMES]  # 방식별 소요 시간 (기록 시 분류)
+
+        # 요청 지연 컬럼
+        # 최근 max_raw_samples개를 담는 고정 크기 링 버퍼 (keep_raw일 때만 할당)
+        capacity = max_raw_samples if keep_raw else 0
+        self._lat_vals = array('d', bytes(8 * capacity))
+        self._lat_ok = array('B', bytes(capacity))
+        self._lat_ts = array('q', bytes(8 * capacity))  # 시작 이후 경과 ns
+        self._lat_pos = 0  # 다음 기록 위치
+        self._lat_filled = 0  # 채워진 칸 수
+        self._lat_count = 0
+        self._lat_sum = 0.0
+        self._lat_success = 0
+        self._lat_mean = 0.0
+        self._lat_m2 = 0.0
+        self._lat_hist = array('Q', bytes(8 * _HIST_BUCKETS))
+
+        self.leader_failures = deque(maxlen=max_raw_samples)
+        # 처리량: 노드별 누적 집계 (O(노드 수)) + 최근 원본 샘플만 제한 보관
+        self._tput_agg = defaultdict(lambda: {'n': 0, 'sum': 0.0, 'max': 0.0, 'last_ts': 0.0})
+        self.throughput_data = defaultdict(lambda: deque(maxlen=256))
         self.leader_transitions = []
         self.sub_leader_promotions = []
-        self.promotion_failures = []
+        self.promotion_failures = deque(maxlen=max_raw_samples)
+        self._promotion_failure_count = 0
+        self._leader_failure_count = 0
         self.start_time = time.time()
+        self._t0_ns = time.perf_counter_ns()  # 기록 타임스탬프 기준 (단조 시계, 정수 ns)
         self.lock = threading.Lock()
 
-    def record_election_time(self, duration, winner_id, is_sub_leader, method):
-        """선거/승격 시간 기록"""
+        # 스레드별 기록 버퍼: record_*는 락 없이 자기 버퍼에 추가하고
+        # 조회(get_summary/export_*) 시 락을 한 번 잡고 전역 저장소로 병합한다
+        self._tls = threading.local()
+        self._buffers = []  # [(소유 스레드, 버퍼), ...]
+        # 지연 기록은 (값, 성공, 시각) 튜플 대신 스레드별 array 컬럼에 바로 추가
+        self._lat_shards = []  # [(소유 스레드, (vals, ok, ts)), ...]
+
+        # 요약 캐시: 병합된 레코드 수(_version)가 그대로면 재계산하지 않음
+        self._version = 0
+        self._summary_cache = None  # (버전, summary)
+        self._pct_cache = None  # (지연 기록 수, [p50, p95, p99])
+
+    def _local_buffer(self):
+        """현재 스레드의 기록 버퍼 반환 (최초 1회만 락으로 등록)"""
+        try:
+            return self._tls.buffer
+        except AttributeError:
+            buf = []
+            self._tls.buffer = buf
+            with self.lock:
+                self._buffers.append((threading.current_thread(), buf))
+            return buf
+
+    def _append_local(self, entry):
+        """
+        현재 스레드 버퍼에 기록 추가
+
+        조회가 드문 경우(ec2_server는 종료 시에만 읽음)에도 버퍼가 끝없이 자라지 않도록
+        max_raw_samples개가 쌓이면 그 자리에서 전역 저장소로 병합한다.
+        """
+        buf = self._local_buffer()
+        buf.append(entry)
+        if len(buf) >= self.max_raw_samples:
+            with self.lock:
+                self._flush_locked()
+
+    def _local_latency_shard(self):
+        """현재 스레드의 지연 컬럼 샤드 (vals, ok, ts) 반환 (최초 1회만 락으로 등록)"""
+        try:
+            return self._tls.latency
+        except AttributeError:
+            shard = (array('d'), array('B'), array('q'))
+            self._tls.latency = shard
+            with self.lock:
+                self._lat_shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _flush_locked(self):
+        """
+        스레드별 버퍼를 전역 저장소로 병합 (self.lock 보유 상태에서 호출)
+
+        종료된 스레드의 버퍼는 비운 뒤 등록 목록에서 제거한다
+        (연결마다 생기는 수신 스레드 등이 쌓이지 않도록).
+        """
+        live = []
+        for owner, buf in self._buffers:
+            # 소유 스레드는 끝에만 추가하므로 앞쪽 n개만 옮기고 지우면 안전
+            n = len(buf)
+            if n:
+                for store, args in buf[:n]:
+                    store(self, *args)
+                del buf[:n]
+                self._version += n
+            if buf or owner.is_alive():
+                live.append((owner, buf))
+        self._buffers = live
+
+        live = []
+        for owner, shard in self._lat_shards:
+            vals, ok, ts = shard
+            # ts를 마지막에 추가하므로 len(ts)개까지는 세 컬럼이 모두 채워져 있다
+            n = len(ts)
+            if n:
+                for i in range(n):
+                    _store_latency(self, vals[i], ok[i], ts[i])
+                for column in shard:
+                    del column[:n]
+                self._version += n
+            if ts or owner.is_alive():
+                live.append((owner, shard))
+        self._lat_shards = live
+
+    def _elapsed(self):
+        """시작 이후 경과 시간 (초)"""
+        return (time.perf_counter_ns() - self._t0_ns) / 1e9
+
+    @property
+    def election_times(self):
+        """선거 기록 리스트 (dict, 내보내기/호환용)"""
         with self.lock:
-            self.election_times.append({
-                'duration': duration,
-                'winner': winner_id,
-                'is_sub_leader': is_sub_leader,
-                'method': method,  # 'instant_promotion' or 'voting'
-                'timestamp': time.time() - self.start_time
-            })
+            self._flush_locked()
+            columns = self._election_columns_locked()
+        return _election_records(columns)
+
+    @property
+    def request_latencies(self):
+        """요청 지연 기록 리스트 (dict, 내보내기/호환용)"""
+        with self.lock:
+            self._flush_locked()
+            columns = self._latency_columns_locked()
+        return _latency_records(columns)
+
+    def _election_columns_locked(self):
+        """선거 컬럼 스냅샷 (array 슬라이스 복사, self.lock 보유 상태에서 호출)"""
+        return (self._elect_dur[:], self._elect_winner[:], self._elect_sub[:],
+                self._elect_method[:], self._elect_ts[:])
+
+    def _latency_columns_locked(self, last=None):
+        """지연 컬럼 스냅샷 (최근 last개, 시간 순서, self.lock 보유 상태에서 호출)"""
+        filled = self._lat_filled
+        count = filled if last is None else min(last, filled)
+        pos = self._lat_pos
+        start = pos - count
+        columns = []
+        for column in (self._lat_vals, self._lat_ok, self._lat_ts):
+            if start >= 0:
+                columns.append(column[start:pos])
+            else:
+                # 링 끝부분 + 앞부분
+                columns.append(column[start:] + column[:pos])
+        return tuple(columns)
+
+    def record_election_time(self, duration, winner_id, is_sub_leader, method):
+        """
+        선거/승격 시간 기록
+
+        method: METHOD_INSTANT/METHOD_VOTING 또는 'instant_promotion'/'voting'
+        """
+        if method.__class__ is str:
+            method = _METHOD_CODES[method]
+        self._append_local((_store_election, (
+            duration, winner_id, is_sub_leader, method,
+            time.perf_counter_ns() - self._t0_ns
+        )))
 
     def record_promotion_failure(self, node_id, term, ack_count, required):
         """서브리더 승격 실패 기록"""
-        with self.lock:
-            self.promotion_failures.append({
-                'node_id': node_id,
-                'term': term,
-                'ack_count': ack_count,
-                'required': required,
-                'timestamp': time.time() - self.start_time
-            })
+        self._append_local((_store_promotion_failure, ({
+            'node_id': node_id,
+            'term': term,
+            'ack_count': ack_count,
+            'required': required,
+            'timestamp': self._elapsed()
+        },)))
 
     def record_request_latency(self, latency, success):
         """클라이언트 요청 응답 시간 기록"""
-        with self.lock:
-            self.request_latencies.append({
-                'latency': latency,
-                'success': success,
-                'timestamp': time.time() - self.start_time
-            })
+        try:
+            vals, ok, ts = self._tls.latency
+        except AttributeError:
+            vals, ok, ts = self._local_latency_shard()
+        vals.append(latency)
+        ok.append(1 if success else 0)
+        ts.append(time.perf_counter_ns() - self._t0_ns)
+        if len(ts) >= self.max_raw_samples:
+            # 조회 없이도 샤드가 원본 보관 상한 이상 자라지 않도록 병합
+            with self.lock:
+                self._flush_locked()
 
     def record_leader_failure(self, old_leader_id, term):
         """리더 장애 발생 기록"""
-        with self.lock:
-            self.leader_failures.append({
-                'old_leader': old_leader_id,
-                'term': term,
-                'timestamp': time.time() - self.start_time
-            })
+        self._append_local((_store_leader_failure, ({
+            'old_leader': old_leader_id,
+            'term': term,
+            'timestamp': self._elapsed()
+        },)))
 
     def record_throughput(self, node_id, requests_per_second):
         """처리량 기록"""
-        with self.lock:
-            self.throughput_data[node_id].append({
-                'rps': requests_per_second,
-                'timestamp': time.time() - self.start_time
-            })
+        self._append_local((_store_throughput, (
+            node_id, requests_per_second, self._elapsed()
+        )))
 
     def get_summary(self):
-        """수집된 메트릭 요약"""
+        """
+        수집된 메트릭 요약 (새 기록이 없으면 캐시된 결과의 복사본 반환)
+
+        락은 병합과 스냅샷(스칼라 값, 필요 시 지연 컬럼 복사)에만 잡고
+        정렬/백분위 계산은 락 밖에서 한다.
+        """
         with self.lock:
-            instant_promotions = [e for e in self.election_times
-                                  if e['method'] == 'instant_promotion']
-            voting_elections = [e for e in self.election_times
-                               if e['method'] == 'voting']
-
-            summary = {
-                'total_elections': len(self.election_times),
-                'instant_promotions': len(instant_promotions),
-                'voting_elections': len(voting_elections),
-                'promotion_failures': len(self.promotion_failures),
-                'leader_failures': len(self.leader_failures),
-                'total_requests': len(self.request_latencies),
-                'successful_requests': len([r for r in self.request_latencies if r['success']]),
-            }
-
-            # 평균 시간 계산
-            if self.election_times:
-                summary['avg_election_time_ms'] = statistics.mean(
-                    [e['duration'] * 1000 for e in self.election_times]
-                )
-            else:
-                summary['avg_election_time_ms'] = 0
+            self._flush_locked()
+            version = self._version
+            cached = self._summary_cache
+            if cached is not None and cached[0] == version:
+                return dict(cached[1])
 
-            if instant_promotions:
-                summary['avg_instant_promotion_ms'] = statistics.mean(
-                    [e['duration'] * 1000 for e in instant_promotions]
-                )
-            else:
-                summary['avg_instant_promotion_ms'] = 0
+            counts = list(self._elect_count)
+            sums = list(self._elect_sum)
+            method_durations = [d[:] for d in self._elect_dur_by_method]
+            promotion_failures = self._promotion_failure_count
+            leader_failures = self._leader_failure_count
+            n = self._lat_count
+            lat_sum = self._lat_sum
+            lat_m2 = self._lat_m2
+            lat_success = self._lat_success
+            tput_avg = {node_id: agg['sum'] / agg['n']
+                        for node_id, agg in self._tput_agg.items()}
 
-            if voting_elections:
-                summary['avg_voting_election_ms'] = statistics.mean(
-                    [e['duration'] * 1000 for e in voting_elections]
-                )
-            else:
-                summary['avg_voting_election_ms'] = 0
-
-            if self.request_latencies:
-                latencies = [r['latency'] * 1000 for r in self.request_latencies]
-                summary['avg_latency_ms'] = statistics.mean(latencies)
-                summary['p50_latency_ms'] = statistics.median(latencies)
-                summary['p99_latency_ms'] = (
-                    sorted(latencies)[int(len(latencies) * 0.99)]
-                    if len(latencies) >= 100 else max(latencies)
-                )
-            else:
-                summary['avg_latency_ms'] = 0
-                summary['p50_latency_ms'] = 0
-                summary['p99_latency_ms'] = 0
+            # 백분위는 지연 기록이 늘었을 때만 다시 계산 (원본 또는 히스토그램 복사)
+            percentiles = None
+            raw = hist = None
+            pct = self._pct_cache
+            if pct is not None and pct[0] == n:
+                percentiles = pct[1]
+            elif n and self._lat_filled == n:
+                raw = self._lat_vals[:n]
+            elif n:
+                hist = self._lat_hist[:]
+
+        instant = METHOD_INSTANT
+        voting = METHOD_VOTING
+        total_elections = sum(counts)
+
+        summary = {
+            'total_elections': total_elections,
+            'instant_promotions': counts[instant],
+            'voting_elections': counts[voting],
+            'promotion_failures': promotion_failures,
+            'leader_failures': leader_failures,
+            'total_requests': n,
+            'successful_requests': lat_success,
+            'throughput_avg_by_node': tput_avg,
+        }
+
+        # 평균 시간 계산 (기록 시 누적한 횟수/합에서 바로 계산)
+        if total_elections:
+            summary['avg_election_time_ms'] = sum(sums) / total_elections * 1000
+        else:
+            summary['avg_election_time_ms'] = 0
+
+        if counts[instant]:
+            summary['avg_instant_promotion_ms'] = sums[instant] / counts[instant] * 1000
+        else:
+            summary['avg_instant_promotion_ms'] = 0
+
+        if counts[voting]:
+            summary['avg_voting_election_ms'] = sums[voting] / counts[voting] * 1000
+        else:
+            summary['avg_voting_election_ms'] = 0
+
+        # 방식별 p99 (기록 시 이미 분류돼 있어 필터링 없이 바로 계산)
+        for code, key in ((instant, 'p99_instant_promotion_ms'),
+                          (voting, 'p99_voting_election_ms')):
+            durations = method_durations[code]
+            summary[key] = _multi_percentile(durations, (99,))[0] * 1000 if durations else 0
 
-            return summary
+        if n:
+            # 원본이 전체를 담고 있으면 정확한 값, 아니면 히스토그램 근사 (ms 변환은 결과에만)
+            if percentiles is None:
+                if raw is not None:
+                    percentiles = _multi_percentile(raw, (50, 95, 99))
+                else:
+                    percentiles = _hist_percentile(hist, n, (50, 95, 99))
+                self._pct_cache = (n, percentiles)
+            p50, p95, p99 = percentiles
+            summary['avg_latency_ms'] = lat_sum / n * 1000
+            summary['stddev_latency_ms'] = (
+                math.sqrt(lat_m2 / (n - 1)) * 1000 if n > 1 else 0.0
+            )
+            summary['p50_latency_ms'] = p50 * 1000
+            summary['p95_latency_ms'] = p95 * 1000
+            summary['p99_latency_ms'] = p99 * 1000
+        else:
+            summary['avg_latency_ms'] = 0
+            summary['stddev_latency_ms'] = 0
+            summary['p50_latency_ms'] = 0
+            summary['p95_latency_ms'] = 0
+            summary['p99_latency_ms'] = 0
+
+        # 튜플 한 번 대입으로 교체 (동시 호출이 덮어써도 버전 비교로 재계산될 뿐)
+        self._summary_cache = (version, summary)
+        return dict(summary)
 
     def print_summary(self):
         """실험 결과 요약 출력"""
@@ -155,9 +549,11 @@ class MetricsCollector:
         print(f"\n[전환 시간 (Transition Time)]")
         print(f"  평균 전환 시간: {summary['avg_election_time_ms']:.2f} ms")
         if summary['instant_promotions'] > 0:
-            print(f"  평균 즉시 승격: {summary['avg_instant_promotion_ms']:.2f} ms")
+            print(f"  평균 즉시 승격: {summary['avg_instant_promotion_ms']:.2f} ms "
+                  f"(P99 {summary['p99_instant_promotion_ms']:.2f} ms)")
         if summary['voting_elections'] > 0:
-            print(f"  평균 투표 선거: {summary['avg_voting_election_ms']:.2f} ms")
+            print(f"  평균 투표 선거: {summary['avg_voting_election_ms']:.2f} ms "
+                  f"(P99 {summary['p99_voting_election_ms']:.2f} ms)")
 
         print(f"\n[클라이언트 요청 (Client Requests)]")
         print(f"  총 요청: {summary['total_requests']}")
@@ -165,6 +561,7 @@ class MetricsCollector:
         if summary['total_requests'] > 0:
             print(f"  평균 지연: {summary['avg_latency_ms']:.2f} ms")
             print(f"  P50 지연: {summary['p50_latency_ms']:.2f} ms")
+            print(f"  P95 지연: {summary['p95_latency_ms']:.2f} ms")
             print(f"  P99 지연: {summary['p99_latency_ms']:.2f} ms")
 
         print(f"\n[장애 (Failures)]")
@@ -176,28 +573,80 @@ class MetricsCollector:
 
     def export_json(self, filepath):
         """결과를 JSON 파일로 내보내기"""
+        # get_summary()가 self.lock을 잡으므로 락 밖에서 먼저 호출 (Lock은 재진입 불가)
+        summary = self.get_summary()
         with self.lock:
-            data = {
-                'timestamp': datetime.now().isoformat(),
-                'summary': self.get_summary(),
-                'election_times': self.election_times,
-                'promotion_failures': self.promotion_failures,
-                'leader_failures': self.leader_failures,
-                'request_latencies': self.request_latencies[:1000],  # 최대 1000개
-            }
+            # 락 안에서는 스냅샷만, dict 변환/직렬화는 락 밖에서
+            self._flush_locked()
+            elections = self._election_columns_locked()
+            latencies = self._latency_columns_locked(1000)  # 최근 1000개
+            promotion_failures = list(self.promotion_failures)
+            leader_failures = list(self.leader_failures)
+
+        data = {
+            'timestamp': datetime.now().isoformat(),
+            'summary': summary,
+            'election_times': _election_records(elections),
+            'promotion_failures': promotion_failures,
+            'leader_failures': leader_failures,
+            'request_latencies': _latency_records(latencies),
+        }
 
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2)
+        # 한 번에 직렬화해서 한 번에 기록 (orjson 없으면 들여쓰기 없는 표준 json)
+        if orjson is not None:
+            # 노드 ID(int) 키는 표준 json처럼 문자열 키로 내보냄
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        with open(filepath, 'wb', buffering=1 << 20) as f:
+            f.write(payload)
 
-            print(f"[Metrics] Exported to {filepath}")
+        print(f"[Metrics] Exported to {filepath}")
+
+    def export_ndjson(self, filepath):
+        """
+        선거/지연 기록을 NDJSON(한 줄에 레코드 하나)으로 내보내기
+
+        ts_ns는 벽시계 기준 정수 ns (start_time 기준값 + 기록 시 경과 ns)라
+        행마다 날짜 문자열을 만들지 않는다.
+        """
+        with self.lock:
+            self._flush_locked()
+            elections = self._election_columns_locked()
+            latencies = self._latency_columns_locked()
+
+        base = int(self.start_time * 1e9)
+        out = [
+            f'{{"type":"election","ts_ns":{base + ts},"duration_ms":{duration * 1000:.3f},'
+            f'"winner":{winner},"method":"{_METHOD_NAMES[method]}",'
+            f'"is_sub_leader":{"true" if is_sub else "false"}}}\n'
+            for duration, winner, is_sub, method, ts in zip(*elections)
+        ]
+        out.extend(
+            f'{{"type":"latency","ts_ns":{base + ts},"latency_ms":{latency * 1000:.3f},'
+            f'"success":{"true" if ok else "false"}}}\n'
+            for latency, ok, ts in zip(*latencies)
+        )
+
+        with open(filepath, 'w', buffering=1 << 20) as f:
+            f.write(''.join(out))
+
+        print(f"[Metrics] Exported to {filepath}")
 
     def export_csv(self, filepath):
         """결과를 CSV 파일로 내보내기 (선거 시간만)"""
         with self.lock:
-            with open(filepath, 'w') as f:
-                f.write("timestamp,duration_ms,winner,method,is_sub_leader\n")
-                for e in self.election_times:
-                    f.write(f"{e['timestamp']:.3f},{e['duration']*1000:.2f},"
-                           f"{e['winner']},{e['method']},{e['is_sub_leader']}\n")
+            self._flush_locked()
+            columns = self._election_columns_locked()
+
+        # 컬럼에서 바로 행 문자열을 만들어 한 번에 기록
+        out = ["timestamp,duration_ms,winner,method,is_sub_leader\n"]
+        out.extend(
+            f"{ts / 1e9:.3f},{duration*1000:.2f},{winner},{_METHOD_NAMES[method]},{bool(is_sub)}\n"
+            for duration, winner, is_sub, method, ts in zip(*columns)
+        )
+
+        with open(filepath, 'w', buffering=1 << 20) as f:
+            f.write(''.join(out))
 
-            print(f"[Metrics] Exported to {filepath}")
+        print(f"[Metrics] Exported to {filepath}")
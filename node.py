@@ -10,16 +10,21 @@ S-Raft 합의 알고리즘 노드 구현
 - AWS EC2 환경에 최적화
 """
 
+import heapq
+import queue
 import threading
 import time
 import random
+from array import array
 from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 
 from message import (
     Message, MessageType, LogEntry,
     create_append_entries, create_append_ack,
     create_request_vote, create_vote_response
 )
+from metrics import METHOD_INSTANT, METHOD_VOTING
 
 
 class NodeState:
@@ -30,6 +35,22 @@ class NodeState:
     STOPPED = 'Stopped'
 
 
+# 노드 집합 비트마스크의 원소 수 (Python 3.10+는 int.bit_count 사용)
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    def _popcount(mask):
+        return bin(mask).count('1')
+
+
+def _subleader_rank(sub_leaders, node_id):
+    """[(node_id, rank), ...]에서 node_id의 rank 조회 (없으면 None, 서브리더는 1~2개)"""
+    for nid, rank in sub_leaders:
+        if nid == node_id:
+            return rank
+    return None
+
+
 class RaftNode:
     """
     S-Raft 노드 클래스
@@ -54,6 +75,7 @@ class RaftNode:
         """
         self.id = node_id
         self.total_nodes = total_nodes
+        self.majority = (total_nodes // 2) + 1  # 과반 (클러스터 크기 고정)
         self.config = config
         self.transport = transport
         self.metrics = metrics
@@ -62,7 +84,10 @@ class RaftNode:
         self.state = NodeState.FOLLOWER
         self.current_term = 0
         self.voted_for = None
-        self.log = []  # [LogEntry, ...]
+        # 로그 (SoA): i번째 엔트리(인덱스 i+1)의 term과 command를 따로 보관
+        # 잘라내기는 del로 제자리 처리, LogEntry는 전송/적용할 때만 생성
+        self.log_terms = array('q')
+        self.log_commands = []
         self.commit_index = 0
         self.last_applied = 0
         self.leader_id = None
@@ -71,42 +96,75 @@ class RaftNode:
         # ===== S-Raft 서브리더 상태 =====
         self.is_sub_leader = False
         self.subleader_rank = None  # 0=Primary, 1=Secondary
-        self.current_sub_leaders = {}  # {node_id: rank}
+        self.current_sub_leaders = ()  # ((node_id, rank), ...) rank 순서
+        self._own_subleader_rank = None  # current_sub_leaders에서 이 노드의 rank (팔로워)
         self.subleaders_assigned = False
+        # 리더가 하트비트에 싣는 서브리더 목록 캐시 (None이면 아직 미지정 → 다음 전송 때 계산)
+        self._subleader_payload = None
+        self.num_sub_leaders = config.subleader_count(total_nodes)  # 클러스터 크기 고정이므로 한 번만 계산
         self.leader_elected_time = None
 
         # RTT 측정
-        self.response_times = {}  # {node_id: rtt}
-        self.message_sent_times = {}  # {node_id: sent_time}
+        self.response_times = [None] * total_nodes  # node_id → RTT EMA (None이면 미측정)
+        self.rtt_measured = 0  # RTT가 측정된 노드 수
+        self.message_sent_times = {}  # {node_id: sent_time (monotonic)}
+        self.rtt_ema = 0.0  # 리더가 측정한 클러스터 RTT EMA
+        self.rtt_var = 0.0  # 클러스터 RTT 평균 편차 EMA (꼬리 지연 추정용)
+        self.rtt_hint = 0.0  # 선거 타임아웃 계산에 쓰는 RTT 꼬리 추정치 (리더가 AppendEntries로 전파)
+        self.timeouts = config.scaled(self.rtt_hint)
+
+        # 선거 타임아웃 난수: 노드별 Random 인스턴스(OS 엔트로피 시드, 노드끼리 같은 수열이
+        # 나오지 않음)의 uniform을 미리 바인딩하고 역할별 (min, max) 범위는 타임아웃이 바뀔 때만 다시 계산
+        self._runif = random.Random().uniform
+        self._timeout_ranges = self._compute_timeout_ranges()
 
         # ===== 승격 상태 =====
         self.is_promotion_pending = False
         self.promotion_start_time = 0
         self.promotion_ack_count = 0
-        self.promotion_ack_nodes = set()
+        self.promotion_ack_mask = 0  # ACK한 노드 비트마스크 (bit i = 노드 i)
         self.promotion_confirmed = False
 
         # ===== Leader Lease (Split-brain 방지) =====
-        self.last_majority_ack_time = time.time()
-        self.recent_ack_nodes = set()
+        self.last_majority_ack_time = time.monotonic()
+        self.recent_ack_mask = 0  # 최근 하트비트에 ACK한 노드 비트마스크
+        self.lease_timeout = max(config.heartbeat_interval * 30, 3.0)
 
         # ===== 로그 복제 추적 (리더 전용) =====
         self.next_index = {}  # {node_id: next_log_index}
+        self.in_flight = [[] for _ in range(total_nodes)]  # 팔로워별 응답 대기 중인 엔트리 전송 [(마지막 인덱스, 전송 시각), ...]
+        self.last_ack_times = [0.0] * total_nodes  # 팔로워별 마지막 AppendAck 수신 시각
         self.match_index = {}  # {node_id: match_log_index}
 
         # ===== 선거 상태 =====
         self.votes_received = 0
-        self.voted_nodes = set()
+        self.voted_mask = 0  # 투표한 노드 비트마스크
         self.election_start_time = 0
         self.consecutive_election_failures = 0
 
         # ===== 타이머 =====
-        self.last_heartbeat = time.time()
+        self.last_heartbeat = time.monotonic()
         self.election_timeout = self._reset_election_timer()
 
-        # ===== 스레드 제어 =====
+        # ===== 스레드 제어 (단일 스레드 이벤트 루프) =====
+        # 수신 메시지와 로컬 이벤트(명령 제출, 종료 알림)를 같은 큐에서 꺼내
+        # run() 스레드 하나가 순서대로 처리하므로 노드 상태에 락을 쓰지 않는다
         self.running = True
-        self.lock = threading.Lock()
+        self._inbox = transport.recv_queue  # transport가 수신 메시지를 넣는 큐를 공유
+        self._loop_thread = None  # run()을 실행 중인 스레드
+        # 메시지 타입 → 핸들러 (if/elif 체인 대신 dict 조회 한 번)
+        self._dispatch = {
+            MessageType.APPEND_ENTRIES: self._handle_append_entries,
+            MessageType.APPEND_ACK: self._handle_append_ack,
+            MessageType.REQUEST_VOTE: self._handle_request_vote,
+            MessageType.VOTE_RESPONSE: self._handle_vote_response,
+        }
+        # 메시지 전송 경로
+        self._send_message = transport.send
+        # 인코딩된 프레임 전송/일괄 전송 (지원하지 않는 transport면 None → Message 단위 send)
+        self._send_frame = getattr(transport, 'send_prebuilt', None)
+        self._transport_broadcast = getattr(transport, 'broadcast', None)
+        self._peers = tuple(i for i in range(total_nodes) if i != node_id)  # 자신을 제외한 노드 ID
 
         # ===== 노드별 통계 =====
         self.stats = {
@@ -123,100 +181,171 @@ class RaftNode:
         self.on_become_leader = None
         self.on_become_follower = None
         self.on_log_committed = None
+        self.on_log_committed_batch = None  # 설정 시 커밋된 엔트리 리스트를 한 번에 전달
 
         # ===== 시작 시 Term 학습 =====
         self.startup_grace_period = True
-        self.startup_time = time.time()
+        self.startup_time = time.monotonic()
         self.startup_grace_duration = 5.0
 
         print(f"[Node {self.id}] Initialized - election timeout: {self.election_timeout*1000:.0f}ms")
 
-    def _reset_election_timer(self):
-        """선거 타임아웃 리셋"""
-        if not self.had_leader_before:
-            base_offset = self.id * 0.05
-            return random.uniform(
-                self.config.election_timeout_base + base_offset,
-                self.config.election_timeout_base * 2 + base_offset
-            )
+    def _announce(self, title, *details):
+        """
+        선거/승격 이벤트 출력 (중요 메시지 전송 이후에 호출)
 
-        if self.config.enable_subleader and self.is_sub_leader:
-            if self.subleader_rank == 0:  # Primary
-                return random.uniform(
-                    self.config.primary_timeout_min,
-                    self.config.primary_timeout_max
-                )
-            elif self.subleader_rank == 1:  # Secondary
-                return random.uniform(
-                    self.config.secondary_timeout_min,
-                    self.config.secondary_timeout_max
-                )
+        debug 모드에서만 여러 줄 배너를 만들고, 평소에는 한 줄 요약만 출력.
+        어느 쪽이든 print는 한 번만 호출한다.
+        """
+        if self.config.debug:
+            bar = '=' * 60
+            body = ''.join(f"  {d}\n" for d in details)
+            print(f"\n{bar}\n[{title}] Node {self.id}\n{body}{bar}\n")
+        else:
+            print(f"[Node {self.id}] {title}: {', '.join(details)}")
 
+    def _compute_timeout_ranges(self):
+        """역할별 선거 타임아웃 범위 (초기 선거, Primary, Secondary, Follower)"""
+        timeouts = self.timeouts  # RTT 기반으로 스케일된 타임아웃
+        base_offset = self.id * 0.05
         id_offset = (self.id % self.total_nodes) * 0.15
-        return random.uniform(
-            self.config.follower_timeout_min + id_offset,
-            self.config.follower_timeout_max + id_offset
+        return (
+            (timeouts.election_timeout_base + base_offset,
+             timeouts.election_timeout_base * 2 + base_offset),
+            (timeouts.primary_timeout_min, timeouts.primary_timeout_max),
+            (timeouts.secondary_timeout_min, timeouts.secondary_timeout_max),
+            (timeouts.follower_timeout_min + id_offset,
+             timeouts.follower_timeout_max + id_offset),
         )
 
+    def _reset_election_timer(self):
+        """선거 타임아웃 리셋"""
+        ranges = self._timeout_ranges
+
+        if not self.had_leader_before:
+            lo, hi = ranges[0]
+        elif self.config.enable_subleader and self.is_sub_leader and self.subleader_rank in (0, 1):
+            lo, hi = ranges[1 + self.subleader_rank]  # Primary / Secondary
+        else:
+            lo, hi = ranges[3]
+        return self._runif(lo, hi)
+
+    def _set_rtt_hint(self, rtt):
+        """선거 타임아웃 계산에 쓰는 RTT 갱신"""
+        self.rtt_hint = rtt
+        self.timeouts = self.config.scaled(rtt)
+        self._timeout_ranges = self._compute_timeout_ranges()
+
     def run(self):
         """노드 메인 루프"""
-        self.last_heartbeat = time.time()
+        self.last_heartbeat = time.monotonic()
+        self._loop_thread = threading.current_thread()
         print(f"[Node {self.id}] Started running")
 
+        inbox = self._inbox
+        tick_floor = self.config.auto_tick_period
         while self.running:
-            msg = self.transport.receive(timeout=self.config.recv_timeout)
-            if msg:
-                self._handle_message(msg)
-
-            self._check_timers()
-            time.sleep(self.config.auto_tick_period)
+            # 고정 주기 폴링 대신 다음 타이머 만료까지만 대기
+            # (메시지가 오거나 실제 타이머가 만료될 때만 깨어남)
+            # 하한(auto_tick_period): 지난 마감 시각이 남아도 0초 대기로 공회전하지 않음
+            timeout = max(tick_floor, self._next_deadline() - time.monotonic())
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            # 반복마다 시각을 한 번만 읽어 처리 전체에 전달 (같은 틱 안에서 일관된 시각)
+            now = time.monotonic()
+            if item is not None:
+                if item.__class__ is tuple:
+                    self._handle_local_event(item, now)
+                else:
+                    self._handle_message(item, now)
+                    Message.release(item)
+
+            self._check_timers(now)
+
+        # 루프 종료 후 남은 명령 제출은 실패로 응답
+        while True:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item.__class__ is tuple and item[0] == 'submit':
+                item[2].set_result(False)
+
+    def _handle_local_event(self, event, now):
+        """로컬 이벤트 처리 (run() 스레드에서만 호출)"""
+        kind = event[0]
+        if kind == 'submit':
+            event[2].set_result(self._append_command(event[1]))
+        # 'wake': stop()이 대기 중인 루프를 깨우기 위한 이벤트
+
+    def _next_deadline(self):
+        """다음 타이머 만료 시각 (monotonic, _check_timers가 처리할 가장 이른 시각)"""
+        if self.state == NodeState.LEADER:
+            deadline = min(self.last_heartbeat + self.config.heartbeat_interval,
+                           self.last_majority_ack_time + self.lease_timeout)
+        elif self.state == NodeState.CANDIDATE:
+            if self.is_promotion_pending:
+                deadline = self.promotion_start_time + self.config.promotion_timeout
+            else:
+                deadline = self.last_heartbeat + self.election_timeout  # 재선거 시각
+        elif self.startup_grace_period:
+            deadline = self.startup_time + self.startup_grace_duration
+        else:
+            deadline = self.last_heartbeat + self.election_timeout
+        return deadline
 
-    def _check_timers(self):
+    def _check_timers(self, now=None):
         """타이머 체크"""
-        with self.lock:
-            now = time.time()
-
-            if self.state == NodeState.LEADER:
-                if self.is_promotion_pending:
-                    self._check_promotion_success()
+        if now is None:
+            now = time.monotonic()
 
-                lease_timeout = max(self.config.heartbeat_interval * 30, 3.0)
-                if now - self.last_majority_ack_time > lease_timeout:
-                    self._step_down_to_follower("Leader Lease expired")
-                    return
+        if self.state == NodeState.LEADER:
+            if self.is_promotion_pending:
+                self._check_promotion_success(now)
 
-                if now - self.last_heartbeat >= self.config.heartbeat_interval:
-                    self._send_append_entries()
+            if now - self.last_majority_ack_time > self.lease_timeout:
+                self._step_down_to_follower("Leader Lease expired", now)
+                return
 
-            elif self.state == NodeState.CANDIDATE:
-                if self.is_promotion_pending:
-                    self._check_promotion_success()
+            if now - self.last_heartbeat >= self.config.heartbeat_interval:
+                self._send_append_entries(now)
 
-            else:  # FOLLOWER
-                if self.startup_grace_period:
-                    if now - self.startup_time < self.startup_grace_duration:
-                        self.last_heartbeat = now
-                        return
-                    else:
-                        self.startup_grace_period = False
-                        if self.config.debug:
-                            print(f"[Node {self.id}] Startup grace period ended")
+        elif self.state == NodeState.CANDIDATE:
+            if self.is_promotion_pending:
+                self._check_promotion_success(now)
+            elif now - self.last_heartbeat >= self.election_timeout:
+                # 투표가 갈려 과반을 못 얻은 선거: 새 임기로 재선거
+                self._start_election(now)
 
-                if now - self.last_heartbeat >= self.election_timeout:
-                    if self.config.enable_subleader and self.is_sub_leader:
-                        self._instant_promotion()
-                    else:
-                        self._start_election()
-
-    def _instant_promotion(self):
+        else:  # FOLLOWER
+            if self.startup_grace_period:
+                if now - self.startup_time < self.startup_grace_duration:
+                    self.last_heartbeat = now
+                    return
+                else:
+                    self.startup_grace_period = False
+                    self.last_heartbeat = now  # 유예 종료 시점부터 각자의 선거 타임아웃 적용
+                    if self.config.debug:
+                        print(f"[Node {self.id}] Startup grace period ended")
+
+            if now - self.last_heartbeat >= self.election_timeout:
+                if self.config.enable_subleader and self.is_sub_leader:
+                    self._instant_promotion(now)
+                else:
+                    self._start_election(now)
+
+    def _instant_promotion(self, now):
         """S-Raft 즉시 승격"""
         connected = self.transport.get_connected_count()
 
         if connected < 2:
             if self.config.debug:
                 print(f"[Node {self.id}] Instant Promotion SKIPPED: no connections")
-            self.last_heartbeat = time.time()
-            self.election_timeout = self._reset_election_timer() + random.uniform(0.5, 1.0)
+            self.last_heartbeat = now
+            self.election_timeout = self._reset_election_timer() + self._runif(0.5, 1.0)
             return
 
         old_rank = self.subleader_rank
@@ -231,30 +360,27 @@ class RaftNode:
         self.had_leader_before = True
 
         self.promotion_ack_count = 0
-        self.promotion_ack_nodes = {self.id}
-        self.promotion_start_time = time.time()
+        self.promotion_ack_mask = 1 << self.id
+        self.promotion_start_time = now
         self.promotion_confirmed = False
         self.is_promotion_pending = True
 
         self.stats['instant_promotions'] += 1
 
-        print(f"\n{'='*60}")
-        print(f"[S-RAFT INSTANT PROMOTION] Node {self.id}")
-        print(f"  Role: {rank_name} Sub-leader -> Candidate")
-        print(f"  Term: {self.current_term}")
-        print(f"  Connected: {connected}/{self.total_nodes}")
-        print(f"{'='*60}\n")
+        self._send_append_entries(now)
 
-        self._send_append_entries()
-        self.last_heartbeat = time.time()
+        self._announce("S-RAFT INSTANT PROMOTION",
+                       f"Role: {rank_name} Sub-leader -> Candidate",
+                       f"Term: {self.current_term}",
+                       f"Connected: {connected}/{self.total_nodes}")
 
-    def _start_election(self):
+    def _start_election(self, now):
         """기존 Raft 선거 시작"""
         if self.consecutive_election_failures >= 3:
             backoff = min(3.0, (2 ** (self.consecutive_election_failures - 2)) * 0.1)
             if self.config.debug:
                 print(f"[Node {self.id}] Election backoff: {backoff*1000:.0f}ms")
-            self.last_heartbeat = time.time()
+            self.last_heartbeat = now
             self.election_timeout = self._reset_election_timer() + backoff
             self.consecutive_election_failures += 1
             if self.consecutive_election_failures > 8:
@@ -267,99 +393,111 @@ class RaftNode:
             self.consecutive_election_failures += 1
             if self.config.debug:
                 print(f"[Node {self.id}] Pre-Vote FAILED: no connections")
-            self.last_heartbeat = time.time()
-            self.election_timeout = self._reset_election_timer() + random.uniform(0.5, 1.0)
+            self.last_heartbeat = now
+            self.election_timeout = self._reset_election_timer() + self._runif(0.5, 1.0)
             return
 
         self.state = NodeState.CANDIDATE
         self.current_term += 1
         self.voted_for = self.id
         self.votes_received = 1
-        self.voted_nodes = {self.id}
-        self.election_start_time = time.time()
+        self.voted_mask = 1 << self.id
+        self.election_start_time = now
         self.is_sub_leader = False
         self.subleader_rank = None
 
         self.stats['elections_started'] += 1
 
-        election_type = "Initial" if not self.had_leader_before else "Fallback"
-        print(f"\n{'='*60}")
-        print(f"[{election_type.upper()} RAFT ELECTION] Node {self.id}")
-        print(f"  Term: {self.current_term}")
-        print(f"  Connected: {connected}/{self.total_nodes}")
-        print(f"{'='*60}\n")
-
-        for i in range(self.total_nodes):
-            if i != self.id:
-                msg = create_request_vote(
-                    self.id,
-                    self.current_term,
-                    len(self.log),
-                    self.log[-1].term if self.log else 0
-                )
-                self.transport.send(i, msg)
+        # 모든 피어에게 같은 요청이므로 한 번만 만들고 인코딩 (Message가 프레임을 캐시)
+        msg = create_request_vote(
+            self.id,
+            self.current_term,
+            len(self.log_terms),
+            self.log_terms[-1] if self.log_terms else 0
+        )
+        self._broadcast(msg)
 
-        self.last_heartbeat = time.time()
-        self.election_timeout = self._reset_election_timer() + random.uniform(0, 0.1)
+        self.last_heartbeat = now
+        self.election_timeout = self._reset_election_timer() + self._runif(0, 0.1)
         self.consecutive_election_failures += 1
 
-    def _send_append_entries(self):
-        """AppendEntries 전송"""
-        subleader_map = {}
+        election_type = "INITIAL" if not self.had_leader_before else "FALLBACK"
+        self._announce(f"{election_type} RAFT ELECTION",
+                       f"Term: {self.current_term}",
+                       f"Connected: {connected}/{self.total_nodes}")
 
-        if self.config.enable_subleader:
-            num_sub_leaders = int(self.total_nodes * self.config.subleader_ratio)
-
-            if self.subleaders_assigned:
-                subleader_map = self.current_sub_leaders.copy()
-            elif self.response_times and len(self.response_times) >= num_sub_leaders:
-                sorted_nodes = sorted(self.response_times.items(), key=lambda x: x[1])
-                for rank, (node_id, rtt) in enumerate(sorted_nodes[:num_sub_leaders]):
-                    subleader_map[node_id] = rank
+    def _send_append_entries(self, now):
+        """AppendEntries 전송"""
+        # 지정 후에는 캐시된 목록을 그대로 사용 (하트비트마다 정렬/복사 없음)
+        subleader_map = self._subleader_payload
+        if subleader_map is None:
+            subleader_map = self._assign_subleaders()
 
-                self.current_sub_leaders = subleader_map.copy()
-                self.subleaders_assigned = True
+        self.recent_ack_mask = 1 << self.id
 
-                rank_info = []
-                for nid, rank in sorted(subleader_map.items(), key=lambda x: x[1]):
-                    rank_name = "Primary" if rank == 0 else "Secondary"
-                    rtt_ms = self.response_times.get(nid, 0) * 1000
-                    rank_info.append(f"Node {nid}={rank_name}(RTT:{rtt_ms:.1f}ms)")
-                print(f"[Leader {self.id}] Sub-leaders assigned: {', '.join(rank_info)}")
+        if self.state == NodeState.LEADER and self.config.heartbeat_disconnect_timeout > 0:
+            self._check_silent_followers(now)
 
-        self.recent_ack_nodes = {self.id}
-        current_time = time.time()
+        # 같은 next_index의 팔로워는 메시지가 바이트 단위로 같으므로
+        # 한 번 인코딩한 프레임을 재사용 (보통 하트비트는 틱당 1회 인코딩)
+        send_frame = self._send_frame
+        wire_format = self.config.wire_format  # transport와 같은 포맷으로 프레임 인코딩
+        frames = {}  # next_idx → 프레임
+        log_len = len(self.log_terms)
 
         if self.is_promotion_pending:
-            data = {
-                'prev_log_index': 0,
-                'prev_log_term': 0,
-                'entries': [],
-                'leader_commit': len(self.log),
-                'sub_leaders': subleader_map
-            }
-            for i in range(self.total_nodes):
-                if i != self.id:
-                    msg = create_append_entries(
-                        self.id, self.current_term,
-                        data['prev_log_index'], data['prev_log_term'],
-                        data['entries'], data['leader_commit'],
-                        data['sub_leaders']
-                    )
-                    self.message_sent_times[i] = current_time
-                    self.transport.send(i, msg)
+            msg = create_append_entries(
+                self.id, self.current_term, 0, 0, [], log_len,
+                subleader_map, self.rtt_hint
+            )
+            self._broadcast(msg, now)
         else:
+            caught_up = log_len + 1
+            if all(next_idx == caught_up for next_idx in self.next_index.values()):
+                # 빈 하트비트 빠른 경로: 모든 팔로워가 최신이면 팔로워별 로그 조회 없이
+                # 하트비트 하나를 만들어 모두에게 전송
+                msg = create_append_entries(
+                    self.id, self.current_term,
+                    log_len, self.log_terms[-1] if log_len else 0,
+                    [], self.commit_index,
+                    subleader_map, self.rtt_hint
+                )
+                self._broadcast(msg, now)
+                self.last_heartbeat = now
+                return
+
+            max_in_flight = self.config.max_in_flight
+            max_batch = self.config.max_batch_entries
+            # 이 시간 동안 응답이 없는 엔트리 전송은 (연결 끊김 등으로) 유실된 것으로 보고 다시 보냄
+            lost_after = self.timeouts.follower_timeout_max
             for i in range(self.total_nodes):
                 if i != self.id:
-                    next_idx = self.next_index.get(i, len(self.log) + 1)
+                    next_idx = self.next_index.get(i, caught_up)
+                    self.message_sent_times[i] = now
+
+                    # 응답 대기 중인 엔트리 전송이 max_in_flight개면 같은 구간을 또 보내지 않고
+                    # 하트비트만 (ACK가 오면 next_index가 갱신되어 더 큰 배치로 이어서 전송)
+                    pending = self.in_flight[i]
+                    if pending and now - pending[0][1] >= lost_after:
+                        pending.clear()
+                    with_entries = next_idx <= log_len and len(pending) < max_in_flight
+                    if with_entries:
+                        end = log_len if max_batch <= 0 else min(next_idx + max_batch - 1, log_len)
+                        pending.append((end, now))
+                    key = next_idx if with_entries else -next_idx
+                    frame = frames.get(key)
+                    if frame is not None:
+                        send_frame(i, frame)
+                        continue
+
                     prev_log_index = next_idx - 1
                     prev_log_term = 0
 
-                    if prev_log_index > 0 and prev_log_index <= len(self.log):
-                        prev_log_term = self.log[prev_log_index - 1].term
+                    if prev_log_index > 0 and prev_log_index <= log_len:
+                        prev_log_term = self.log_terms[prev_log_index - 1]
 
-                    if next_idx <= len(self.log):
-                        entries = self.log[next_idx - 1:min(next_idx + 99, len(self.log))]
+                    if with_entries:
+                        entries = self._log_entries(next_idx, end)
                     else:
                         entries = []
 
@@ -367,39 +505,121 @@ class RaftNode:
                         self.id, self.current_term,
                         prev_log_index, prev_log_term,
                         entries, self.commit_index,
-                        subleader_map
+                        subleader_map, self.rtt_hint
                     )
-                    self.message_sent_times[i] = current_time
-                    self.transport.send(i, msg)
-
-        self.last_heartbeat = time.time()
-
-    def _handle_message(self, msg):
-        """메시지 처리"""
-        with self.lock:
-            if msg.term > self.current_term:
-                if self.config.debug and self.state == NodeState.LEADER:
-                    print(f"[Node {self.id}] Higher term found: {msg.term} > {self.current_term}")
-                self.current_term = msg.term
-                self._step_down_to_follower("Higher term discovered")
-
-            if msg.type == MessageType.APPEND_ENTRIES:
-                self._handle_append_entries(msg)
-            elif msg.type == MessageType.APPEND_ACK:
-                self._handle_append_ack(msg)
-            elif msg.type == MessageType.REQUEST_VOTE:
-                self._handle_request_vote(msg)
-            elif msg.type == MessageType.VOTE_RESPONSE:
-                self._handle_vote_response(msg)
-
-    def _handle_append_entries(self, msg):
+                    if send_frame is None:
+                        self._send(i, msg)
+                    else:
+                        # 엔트리를 실은 프레임은 헤더/페이로드를 합치지 않고 전송 (큰 배치 복사 방지)
+                        frames[key] = frame = (msg.encode_parts(wire_format) if entries
+                                               else msg.encode(wire_format))
+                        Message.release(msg)
+                        send_frame(i, frame)
+
+        self.last_heartbeat = now
+
+    def _check_silent_followers(self, now):
+        """
+        오래 응답하지 않은 팔로워의 연결을 끊고 다시 연결
+
+        반쯤 열린(half-open) TCP 연결은 keepalive가 감지하기 전까지 send가 계속
+        성공하므로, 마지막 ACK 이후 heartbeat_disconnect_timeout이 지나면 소켓을 닫아
+        다음 전송 때 새 연결을 맺게 한다. 기준은 팔로워 선거 타임아웃 상한 이상으로
+        두어 잠깐 느린(GC, AZ 간 지연) 팔로워는 끊지 않는다.
+        """
+        limit = max(self.config.heartbeat_disconnect_timeout, self.timeouts.follower_timeout_max)
+        last_ack = self.last_ack_times
+        for i in self._peers:
+            silent = now - last_ack[i]
+            if silent >= limit:
+                if self.config.debug:
+                    print(f"[Leader {self.id}] No ACK from Node {i} "
+                          f"for {silent*1000:.0f}ms, reconnecting")
+                self.transport.reconnect(i)
+                last_ack[i] = now  # 새 연결에 다시 한 구간을 줌
+
+    def _assign_subleaders(self):
+        """
+        RTT가 짧은 순서로 서브리더 지정
+
+        지정되면 리더 임기 동안 _subleader_payload에 캐시한다 (새 임기의
+        _init_log_tracking에서 무효화). RTT 측정이 부족하면 ()를 반환하고 다음에 다시 시도.
+        """
+        if not self.config.enable_subleader:
+            self._subleader_payload = ()
+            return ()
+
+        num_sub_leaders = self.num_sub_leaders
+        if not self.rtt_measured or self.rtt_measured < num_sub_leaders:
+            return ()
+
+        # 상위 K개만 선택 (전체 정렬 없이 O(N log K))
+        fastest = heapq.nsmallest(num_sub_leaders, (
+            (rtt, node_id) for node_id, rtt in enumerate(self.response_times)
+            if rtt is not None
+        ))
+        subleader_map = tuple(
+            (node_id, rank) for rank, (rtt, node_id) in enumerate(fastest)
+        )
+
+        self.current_sub_leaders = subleader_map
+        self.subleaders_assigned = True
+        self._subleader_payload = subleader_map
+
+        rank_info = []
+        for nid, rank in subleader_map:
+            rank_name = "Primary" if rank == 0 else "Secondary"
+            rtt_ms = self.response_times[nid] * 1000
+            rank_info.append(f"Node {nid}={rank_name}(RTT:{rtt_ms:.1f}ms)")
+        print(f"[Leader {self.id}] Sub-leaders assigned: {', '.join(rank_info)}")
+        return subleader_map
+
+    def _broadcast(self, msg, now=None):
+        """
+        모든 피어에게 같은 메시지 전송 후 풀에 반환
+
+        transport.broadcast가 있으면 한 번만 직렬화해서 피어 송신 큐에 나눠 넣는다.
+        now가 주어지면 RTT 측정용 전송 시각도 기록.
+        """
+        peers = self._peers
+        if now is not None:
+            sent_times = self.message_sent_times
+            for i in peers:
+                sent_times[i] = now
+        broadcast = self._transport_broadcast
+        if broadcast is not None:
+            broadcast(peers, msg)
+        else:
+            send = self._send_message
+            for i in peers:
+                send(i, msg)
+        Message.release(msg)
+
+    def _send(self, target_id, msg):
+        """메시지 전송 후 Message 풀에 반환 (transport.send는 동기적으로 직렬화)"""
+        self._send_message(target_id, msg)
+        Message.release(msg)
+
+    def _handle_message(self, msg, now):
+        """메시지 처리 (run() 스레드에서만 호출)"""
+        if msg.term > self.current_term:
+            if self.config.debug and self.state == NodeState.LEADER:
+                print(f"[Node {self.id}] Higher term found: {msg.term} > {self.current_term}")
+            self.current_term = msg.term
+            self._step_down_to_follower("Higher term discovered", now)
+
+        handler = self._dispatch.get(msg.type)
+        if handler is not None:
+            handler(msg, now)
+
+    def _handle_append_entries(self, msg, now):
         """AppendEntries 처리"""
         if msg.term < self.current_term:
             ack = create_append_ack(self.id, self.current_term, False, 0)
-            self.transport.send(msg.sender_id, ack)
+            self._send(msg.sender_id, ack)
             return
 
-        self.last_heartbeat = time.time()
+        self.last_heartbeat = now
         self.consecutive_election_failures = 0
         self.startup_grace_period = False
 
@@ -412,17 +632,30 @@ class RaftNode:
         self.current_term = msg.term
         self.leader_id = msg.sender_id
 
+        # 핫패스: 필드는 디코더(_decode_append_entries)가 항상 채우므로 .get 없이 직접 인덱싱
+        data = msg.data
+        log_terms = self.log_terms
+
+        rtt_hint = data['rtt']
+        if rtt_hint != self.rtt_hint:
+            self._set_rtt_hint(rtt_hint)
+
         if not self.had_leader_before:
             self.had_leader_before = True
             self.election_timeout = self._reset_election_timer()
 
-        if self.config.enable_subleader and 'sub_leaders' in msg.data:
-            self.current_sub_leaders = msg.data['sub_leaders']
+        if self.config.enable_subleader:
+            # 리더는 임기 동안 같은 구성을 보내므로 구성이 바뀐 경우에만 rank 재계산
+            sub_leaders = data['sub_leaders']
+            if sub_leaders != self.current_sub_leaders:
+                self.current_sub_leaders = sub_leaders
+                self._own_subleader_rank = _subleader_rank(sub_leaders, self.id)
             was_sub_leader = self.is_sub_leader
-            self.is_sub_leader = self.id in self.current_sub_leaders
+            rank = self._own_subleader_rank
+            self.is_sub_leader = rank is not None
 
             if self.is_sub_leader:
-                self.subleader_rank = self.current_sub_leaders.get(self.id)
+                self.subleader_rank = rank
                 if not was_sub_leader:
                     rank_name = "Primary" if self.subleader_rank == 0 else "Secondary"
                     timeout_ms = self.election_timeout * 1000
@@ -432,94 +665,146 @@ class RaftNode:
             else:
                 self.subleader_rank = None
 
-        prev_log_index = msg.data.get('prev_log_index', 0)
-        prev_log_term = msg.data.get('prev_log_term', 0)
+        prev_log_index = data['prev_log_index']
+        log_len = len(log_terms)  # 로그를 자르거나 늘릴 때만 갱신
 
         log_ok = True
         if prev_log_index > 0:
-            if prev_log_index > len(self.log):
+            if prev_log_index > log_len:
                 log_ok = False
-            elif self.log[prev_log_index - 1].term != prev_log_term:
+            elif log_terms[prev_log_index - 1] != data['prev_log_term']:
                 log_ok = False
-                self.log = self.log[:prev_log_index - 1]
+                log_len = prev_log_index - 1
+                self._truncate_log(log_len)
 
         if not log_ok:
-            ack = create_append_ack(self.id, self.current_term, False, len(self.log))
-            self.transport.send(msg.sender_id, ack)
+            ack = create_append_ack(self.id, self.current_term, False, log_len)
+            self._send(msg.sender_id, ack)
             return
 
-        entries = msg.data.get('entries', [])
+        # 엔트리는 디코딩 단계(_decode_append_entries)에서 이미 LogEntry로 복원됨
+        entries = data['entries']
         if entries:
-            self.log = self.log[:prev_log_index]
-            for entry in entries:
-                if isinstance(entry, dict):
-                    entry = LogEntry.from_dict(entry)
-                self.log.append(entry)
+            self._truncate_log(prev_log_index)
+            log_terms.extend([entry.term for entry in entries])
+            self.log_commands.extend([entry.command for entry in entries])
+            log_len = prev_log_index + len(entries)
 
-        leader_commit = msg.data.get('leader_commit', 0)
+        applied = None
+        leader_commit = data['leader_commit']
         if leader_commit > self.commit_index:
-            self.commit_index = min(leader_commit, len(self.log))
-            self._apply_committed_entries()
+            self.commit_index = min(leader_commit, log_len)
+            applied = self._take_committed_entries()
 
-        ack = create_append_ack(self.id, self.current_term, True, len(self.log))
-        self.transport.send(msg.sender_id, ack)
+        ack = create_append_ack(self.id, self.current_term, True, log_len)
+        self._send(msg.sender_id, ack)
 
-    def _handle_append_ack(self, msg):
+        # 애플리케이션 콜백은 ACK를 보낸 뒤 한 번에 (리더 응답이 적용 시간만큼 늦어지지 않게)
+        if applied:
+            self._deliver_committed(applied)
+
+    def _handle_append_ack(self, msg, now):
         """AppendAck 처리"""
         if self.state not in [NodeState.LEADER, NodeState.CANDIDATE]:
             return
 
         if msg.term > self.current_term:
-            self._step_down_to_follower("Higher term in ACK")
+            self._step_down_to_follower("Higher term in ACK", now)
             return
 
         if msg.term < self.current_term:
             return
 
         sender_id = msg.sender_id
-        success = msg.data.get('success', False)
+        success = msg.data['success']
+        state = self.state
+        promotion_pending = self.is_promotion_pending
+
+        # 거절 응답도 연결이 살아 있다는 뜻이므로 응답 시각 갱신
+        self.last_ack_times[sender_id] = now
+
+        # 엔트리 전송은 팔로워 로그가 그 끝 인덱스까지 찼다는 ACK가 와야 해제
+        # (하트비트 ACK는 match_index가 작아서 대기 중인 전송을 해제하지 않음)
+        pending = self.in_flight[sender_id]
+        if pending:
+            if success:
+                match_index = msg.data['match_index']
+                while pending and pending[0][0] <= match_index:
+                    del pending[0]
+            else:
+                pending.clear()  # 로그 불일치: 대기 중인 전송도 같은 이유로 거절됨
 
-        if not success and self.state == NodeState.LEADER and not self.is_promotion_pending:
+        if not success and state == NodeState.LEADER and not promotion_pending:
             if sender_id in self.next_index:
                 self.next_index[sender_id] = max(1, self.next_index[sender_id] - 1)
             return
 
-        if self.is_promotion_pending and success:
-            if sender_id not in self.promotion_ack_nodes:
-                self.promotion_ack_nodes.add(sender_id)
+        if promotion_pending and success:
+            bit = 1 << sender_id
+            if not self.promotion_ack_mask & bit:
+                self.promotion_ack_mask |= bit
                 self.promotion_ack_count += 1
+                ack_count = _popcount(self.promotion_ack_mask)
 
-                majority = (self.total_nodes // 2) + 1
+                majority = self.majority
                 if self.config.debug:
                     print(f"[Node {self.id}] Promotion ACK from {sender_id}: "
-                          f"{len(self.promotion_ack_nodes)}/{self.total_nodes} "
+                          f"{ack_count}/{self.total_nodes} "
                           f"(need {majority})")
 
-                if len(self.promotion_ack_nodes) >= majority and self.state == NodeState.CANDIDATE:
-                    self._become_leader_from_promotion()
+                if ack_count >= majority and self.state == NodeState.CANDIDATE:
+                    self._become_leader_from_promotion(now)
 
         if self.state == NodeState.LEADER and not self.is_promotion_pending and success:
-            self.recent_ack_nodes.add(sender_id)
-
-            match_index = msg.data.get('match_index', 0)
-            if sender_id in self.match_index:
-                self.match_index[sender_id] = max(self.match_index[sender_id], match_index)
-                self.next_index[sender_id] = self.match_index[sender_id] + 1
-
-            majority = (self.total_nodes // 2) + 1
-            if len(self.recent_ack_nodes) >= majority:
-                self.last_majority_ack_time = time.time()
-
-        if sender_id in self.message_sent_times and success:
-            rtt = time.time() - self.message_sent_times[sender_id]
+            # 이번 하트비트 윈도우(_send_append_entries에서 초기화)에서 새 노드의 ACK가
+            # 과반을 막 넘긴 순간에만 리스 갱신 (이후 ACK는 비트 검사 하나로 끝)
+            bit = 1 << sender_id
+            mask = self.recent_ack_mask
+            if not mask & bit:
+                mask |= bit
+                self.recent_ack_mask = mask
+                if _popcount(mask) == self.majority:
+                    self.last_majority_ack_time = now
+
+            match_index = msg.data['match_index']
+            match = self.match_index
+            if sender_id in match:
+                if match_index > match[sender_id]:
+                    match[sender_id] = match_index
+                self.next_index[sender_id] = match[sender_id] + 1
+
+        sent_time = self.message_sent_times.get(sender_id)
+        if sent_time is not None and success:
+            rtt = now - sent_time
             alpha = self.config.rtt_alpha
 
-            if sender_id in self.response_times:
-                self.response_times[sender_id] = alpha * rtt + (1 - alpha) * self.response_times[sender_id]
+            # 노드 ID로 바로 인덱싱 (dict 해시 조회 없음)
+            response_times = self.response_times
+            prev = response_times[sender_id]
+            if prev is None:
+                response_times[sender_id] = rtt
+                self.rtt_measured += 1
             else:
-                self.response_times[sender_id] = rtt
+                response_times[sender_id] = alpha * rtt + (1 - alpha) * prev
 
-    def _handle_request_vote(self, msg):
+            # 클러스터 RTT EMA와 평균 편차 (TCP RTO 계산과 같은 방식, 첫 측정은 편차 = RTT/2)
+            rtt_ema = self.rtt_ema
+            if rtt_ema:
+                rtt_var = alpha * abs(rtt - rtt_ema) + (1 - alpha) * self.rtt_var
+                rtt_ema = alpha * rtt + (1 - alpha) * rtt_ema
+            else:
+                rtt_var = rtt / 2
+                rtt_ema = rtt
+            self.rtt_ema = rtt_ema
+            self.rtt_var = rtt_var
+
+            # 타임아웃은 평균이 아닌 꼬리 지연 기준 (혼잡으로 RTT가 튀어도 불필요한 선거 방지)
+            # 25% 이상 변할 때만 전파 (하트비트 인코딩 캐시 유지)
+            rtt_tail = rtt_ema + self.config.rtt_tail_k * rtt_var
+            if abs(rtt_tail - self.rtt_hint) > 0.25 * self.rtt_hint:
+                self._set_rtt_hint(rtt_tail)
+
+    def _handle_request_vote(self, msg, now):
         """RequestVote 처리"""
         grant = False
 
@@ -534,8 +819,8 @@ class RaftNode:
             if self.state == NodeState.LEADER and msg.term == self.current_term:
                 grant = False
             elif self.voted_for is None or self.voted_for == msg.sender_id:
-                last_log_index = len(self.log)
-                last_log_term = self.log[-1].term if self.log else 0
+                last_log_index = len(self.log_terms)
+                last_log_term = self.log_terms[-1] if self.log_terms else 0
 
                 candidate_last_index = msg.data.get('last_log_index', 0)
                 candidate_last_term = msg.data.get('last_log_term', 0)
@@ -544,41 +829,42 @@ class RaftNode:
                     (candidate_last_term == last_log_term and candidate_last_index >= last_log_index)):
                     self.voted_for = msg.sender_id
                     grant = True
-                    self.last_heartbeat = time.time()
+                    self.last_heartbeat = now
 
         response = create_vote_response(self.id, self.current_term, grant)
-        self.transport.send(msg.sender_id, response)
+        self._send(msg.sender_id, response)
 
-    def _handle_vote_response(self, msg):
+    def _handle_vote_response(self, msg, now):
         """VoteResponse 처리"""
         if self.state != NodeState.CANDIDATE:
             return
 
         if msg.term > self.current_term:
-            self._step_down_to_follower("Higher term in vote response")
+            self._step_down_to_follower("Higher term in vote response", now)
             return
 
         if msg.term < self.current_term:
             return
 
         if msg.data.get('vote_granted', False):
-            if msg.sender_id in self.voted_nodes:
+            bit = 1 << msg.sender_id
+            if self.voted_mask & bit:
                 return
 
             self.votes_received += 1
-            self.voted_nodes.add(msg.sender_id)
+            self.voted_mask |= bit
             self.stats['votes_received_total'] += 1
 
             if self.config.debug:
                 print(f"[Node {self.id}] Vote from {msg.sender_id}: "
                       f"{self.votes_received}/{self.total_nodes}")
 
-            if self.votes_received > self.total_nodes / 2:
-                self._become_leader_from_election()
+            if self.votes_received >= self.majority:
+                self._become_leader_from_election(now)
 
-    def _become_leader_from_promotion(self):
+    def _become_leader_from_promotion(self, now):
         """즉시 승격으로 리더가 됨"""
-        elapsed = time.time() - self.promotion_start_time
+        elapsed = now - self.promotion_start_time
 
         self.state = NodeState.LEADER
         self.leader_id = self.id
@@ -589,33 +875,31 @@ class RaftNode:
         self.stats['promotion_successes'] += 1
         self.stats['became_leader_count'] += 1
 
-        self.last_majority_ack_time = time.time()
-        self.recent_ack_nodes = {self.id}
+        self.last_majority_ack_time = now
 
-        self._init_log_tracking()
+        self._init_log_tracking(now)
 
         self.subleaders_assigned = False
-        self.current_sub_leaders = {}
-        self.leader_elected_time = time.time()
-
-        print(f"\n{'='*60}")
-        print(f"[INSTANT PROMOTION SUCCESS] Node {self.id} -> LEADER")
-        print(f"  Term: {self.current_term}")
-        print(f"  ACKs: {len(self.promotion_ack_nodes)}/{self.total_nodes}")
-        print(f"  Time: {elapsed*1000:.1f}ms")
-        print(f"{'='*60}\n")
+        self.current_sub_leaders = ()
+        self.leader_elected_time = now
 
         if self.metrics:
-            self.metrics.record_election_time(elapsed, self.id, True, 'instant_promotion')
+            self.metrics.record_election_time(elapsed, self.id, True, METHOD_INSTANT)
 
         if self.on_become_leader:
             self.on_become_leader()
 
-        self._send_append_entries()
+        self._send_append_entries(now)
+
+        self._announce("INSTANT PROMOTION SUCCESS", "-> LEADER",
+                       f"Term: {self.current_term}",
+                       f"ACKs: {_popcount(self.promotion_ack_mask)}/{self.total_nodes} "
+                       f"(mask {self.promotion_ack_mask:#x})",
+                       f"Time: {elapsed*1000:.1f}ms")
 
-    def _become_leader_from_election(self):
+    def _become_leader_from_election(self, now):
         """투표 선거로 리더가 됨"""
-        elapsed = time.time() - self.election_start_time
+        elapsed = now - self.election_start_time
 
         self.state = NodeState.LEADER
         self.leader_id = self.id
@@ -626,64 +910,65 @@ class RaftNode:
 
         self.stats['became_leader_count'] += 1
 
-        self.last_majority_ack_time = time.time()
-        self.recent_ack_nodes = {self.id}
+        self.last_majority_ack_time = now
 
-        self._init_log_tracking()
+        self._init_log_tracking(now)
 
         self.subleaders_assigned = False
-        self.current_sub_leaders = {}
-        self.leader_elected_time = time.time()
-
-        print(f"\n{'='*60}")
-        print(f"[ELECTION SUCCESS] Node {self.id} -> LEADER")
-        print(f"  Term: {self.current_term}")
-        print(f"  Votes: {self.votes_received}/{self.total_nodes}")
-        print(f"  Time: {elapsed*1000:.1f}ms")
-        print(f"{'='*60}\n")
+        self.current_sub_leaders = ()
+        self.leader_elected_time = now
 
         if self.metrics:
-            self.metrics.record_election_time(elapsed, self.id, False, 'voting')
+            self.metrics.record_election_time(elapsed, self.id, False, METHOD_VOTING)
 
         if self.on_become_leader:
             self.on_become_leader()
 
-        self._send_append_entries()
+        self._send_append_entries(now)
+
+        self._announce("ELECTION SUCCESS", "-> LEADER",
+                       f"Term: {self.current_term}",
+                       f"Votes: {self.votes_received}/{self.total_nodes}",
+                       f"Time: {elapsed*1000:.1f}ms")
 
-    def _init_log_tracking(self):
-        """로그 복제 추적 초기화"""
+    def _init_log_tracking(self, now):
+        """로그 복제 추적 초기화 (새 임기: 서브리더 캐시도 무효화, 응답 시각은 리더가 된 시각부터)"""
+        self._subleader_payload = None
+        self.in_flight = [[] for _ in range(self.total_nodes)]
+        self.last_ack_times = [now] * self.total_nodes
         self.next_index = {}
         self.match_index = {}
+        next_idx = len(self.log_terms) + 1
         for i in range(self.total_nodes):
             if i != self.id:
-                self.next_index[i] = len(self.log) + 1
+                self.next_index[i] = next_idx
                 self.match_index[i] = 0
 
-    def _check_promotion_success(self):
+    def _check_promotion_success(self, now):
         """승격 성공 여부 확인"""
-        elapsed = time.time() - self.promotion_start_time
-        majority = (self.total_nodes // 2) + 1
+        elapsed = now - self.promotion_start_time
+        majority = self.majority
+
+        ack_count = _popcount(self.promotion_ack_mask)
 
-        if len(self.promotion_ack_nodes) >= majority and self.state == NodeState.CANDIDATE:
-            self._become_leader_from_promotion()
+        if ack_count >= majority and self.state == NodeState.CANDIDATE:
+            self._become_leader_from_promotion(now)
         elif elapsed > self.config.promotion_timeout:
             self.stats['promotion_failures'] += 1
 
-            print(f"\n{'='*60}")
-            print(f"[INSTANT PROMOTION FAILED] Node {self.id}")
-            print(f"  ACKs: {len(self.promotion_ack_nodes)}/{self.total_nodes} (need {majority})")
-            print(f"  Timeout: {self.config.promotion_timeout*1000:.0f}ms")
-            print(f"{'='*60}\n")
-
             if self.metrics:
                 self.metrics.record_promotion_failure(
                     self.id, self.current_term,
-                    len(self.promotion_ack_nodes), majority
+                    ack_count, majority
                 )
 
-            self._step_down_to_follower("Promotion timeout")
+            self._step_down_to_follower("Promotion timeout", now)
+
+            self._announce("INSTANT PROMOTION FAILED",
+                           f"ACKs: {ack_count}/{self.total_nodes} (need {majority})",
+                           f"Timeout: {self.config.promotion_timeout*1000:.0f}ms")
 
-    def _step_down_to_follower(self, reason=""):
+    def _step_down_to_follower(self, reason, now):
         """Follower로 강등"""
         if self.config.debug and self.state != NodeState.FOLLOWER:
             print(f"[Node {self.id}] Step down to Follower: {reason}")
@@ -692,12 +977,12 @@ class RaftNode:
         self.is_promotion_pending = False
         self.promotion_confirmed = False
         self.promotion_ack_count = 0
-        self.promotion_ack_nodes.clear()
+        self.promotion_ack_mask = 0
         self.voted_for = None
         self.is_sub_leader = False
         self.subleader_rank = None
         self.leader_id = None
-        self.last_heartbeat = time.time()
+        self.last_heartbeat = now
         self.election_timeout = self._reset_election_timer()
 
         if self.on_become_follower:
@@ -705,24 +990,74 @@ class RaftNode:
 
     def _apply_committed_entries(self):
         """커밋된 로그 적용"""
-        while self.last_applied < self.commit_index:
-            self.last_applied += 1
-            if self.last_applied <= len(self.log):
-                entry = self.log[self.last_applied - 1]
-                if self.on_log_committed:
-                    self.on_log_committed(entry)
+        applied = self._take_committed_entries()
+        if applied:
+            self._deliver_committed(applied)
+
+    def _take_committed_entries(self):
+        """last_applied ~ commit_index 구간을 한 번에 꺼내고 last_applied 갱신"""
+        start = self.last_applied + 1
+        self.last_applied = self.commit_index
+        return self._log_entries(start, min(self.commit_index, len(self.log_terms)))
+
+    def _deliver_committed(self, applied):
+        """커밋된 엔트리를 콜백에 전달 (배치 콜백이 있으면 한 번에)"""
+        if self.on_log_committed_batch:
+            self.on_log_committed_batch(applied)
+        elif self.on_log_committed:
+            for entry in applied:
+                self.on_log_committed(entry)
 
     # ===== 클라이언트 인터페이스 =====
 
     def submit_command(self, command):
-        """명령 제출"""
-        with self.lock:
-            if self.state != NodeState.LEADER:
-                return False
+        """
+        명령 제출
 
-            entry = LogEntry(self.current_term, command, len(self.log) + 1)
-            self.log.append(entry)
-            return True
+        다른 스레드에서 호출하면 이벤트 큐에 넣고 run() 스레드가 처리할 때까지 기다린다.
+        run() 스레드(콜백 내부 등)나 run() 시작 전에는 바로 처리.
+        """
+        loop_thread = self._loop_thread
+        if loop_thread is None or loop_thread is threading.current_thread():
+            return self._append_command(command)
+        if not self.running:
+            return False
+
+        future = Future()
+        self._inbox.put(('submit', command, future))
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeout:
+                if not self.running:
+                    return False
+
+    def _append_command(self, command):
+        """리더 로그에 명령 추가"""
+        if self.state != NodeState.LEADER:
+            return False
+
+        self.log_terms.append(self.current_term)
+        self.log_commands.append(command)
+        return True
+
+    # ===== 로그 접근 (SoA) =====
+
+    def _log_entries(self, start, end):
+        """인덱스 start~end (1부터, 양끝 포함) 엔트리를 LogEntry 리스트로 생성"""
+        terms = self.log_terms
+        commands = self.log_commands
+        return [LogEntry(terms[i - 1], commands[i - 1], i) for i in range(start, end + 1)]
+
+    def _truncate_log(self, length):
+        """로그를 앞쪽 length개만 남기고 제자리에서 잘라냄"""
+        del self.log_terms[length:]
+        del self.log_commands[length:]
+
+    @property
+    def log(self):
+        """전체 로그를 LogEntry 리스트로 반환 (조회/호환용, 핫패스에서는 사용하지 않음)"""
+        return self._log_entries(1, len(self.log_terms))
 
     def is_leader(self):
         """리더 여부 확인"""
@@ -741,26 +1076,25 @@ class RaftNode:
             'leader_id': self.leader_id,
             'is_sub_leader': self.is_sub_leader,
             'subleader_rank': self.subleader_rank,
-            'log_length': len(self.log),
+            'log_length': len(self.log_terms),
             'commit_index': self.commit_index
         }
 
     def get_stats(self):
-        """노드 통계 반환"""
-        with self.lock:
-            return {
-                'id': self.id,
-                'state': self.state,
-                'term': self.current_term,
-                'leader_id': self.leader_id,
-                'is_sub_leader': self.is_sub_leader,
-                'subleader_rank': self.subleader_rank,
-                **self.stats
-            }
+        """노드 통계 반환 (읽기 전용 스냅샷, 락 없음)"""
+        return {
+            'id': self.id,
+            'state': self.state,
+            'term': self.current_term,
+            'leader_id': self.leader_id,
+            'is_sub_leader': self.is_sub_leader,
+            'subleader_rank': self.subleader_rank,
+            **self.stats
+        }
 
     def stop(self):
         """노드 중지"""
-        with self.lock:
-            self.running = False
-            self.state = NodeState.STOPPED
-            print(f"[Node {self.id}] Stopped")
+        self.running = False
+        self.state = NodeState.STOPPED
+        self._inbox.put(('wake',))  # 수신 대기 중인 루프를 바로 깨움
+        print(f"[Node {self.id}] Stopped")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""메시지 인코딩/디코딩 왕복 테스트 (JSON, msgpack 위치 기반 to_tuple)"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message import (
+    Message, MessageType, LogEntry, msgpack,
+    create_append_entries, create_append_ack,
+    create_request_vote, create_vote_response,
+)
+
+
+def _sample_messages():
+    """타입별 대표 메시지"""
+    entries = [LogEntry(3, {'type': 'increment', 'value': 1}, 7),
+               LogEntry(3, {'type': 'increment', 'value': 2}, 8)]
+    return [
+        create_append_entries(1, 3, 6, 2, entries, 5, ((2, 0), (4, 1)), 0.0012),
+        create_append_entries(1, 3, 8, 3, [], 8, ((2, 0),), 0.0),
+        create_append_ack(2, 3, True, 8),
+        create_request_vote(4, 5, 8, 3),
+        create_vote_response(0, 5, False),
+        Message(MessageType.CLIENT_REQUEST, 9, 0, {'command': 'get', 'key': 'x'}),
+    ]
+
+
+def _normalize(msg):
+    """비교용 표현 (엔트리는 튜플로, 서브리더 쌍은 리스트로)"""
+    data = dict(msg.data)
+    if msg.type == MessageType.APPEND_ENTRIES:
+        data['entries'] = [(e.term, e.index, e.command) for e in data['entries']]
+        data['sub_leaders'] = [list(pair) for pair in data['sub_leaders']]
+    return (msg.type, msg.sender_id, msg.term, data, msg.timestamp)
+
+
+class TestJsonRoundTrip(unittest.TestCase):
+
+    def test_encode_decode(self):
+        for msg in _sample_messages():
+            decoded = Message.decode(msg.encode('json'), 'json')
+            self.assertEqual(_normalize(decoded), _normalize(msg))
+            self.assertIs(decoded.type, msg.type)  # 타입 문자열은 intern됨
+
+    def test_encode_parts_matches_encode(self):
+        msg = _sample_messages()[0]
+        header, body = msg.encode_parts('json')
+        self.assertEqual(header + body, msg.encode('json'))
+
+    def test_message_id_survives(self):
+        msg = create_append_ack(2, 3, True, 8)
+        message_id = msg.message_id
+        decoded = Message.decode(msg.encode('json'), 'json')
+        self.assertEqual(decoded.message_id, message_id)
+
+    def test_truncated_frame(self):
+        frame = create_append_ack(2, 3, True, 8).encode('json')
+        self.assertIsNone(Message.decode(frame[:-1], 'json'))
+        self.assertIsNone(Message.decode(frame[:2], 'json'))
+
+
+@unittest.skipIf(msgpack is None, "msgpack 미설치")
+class TestMsgpackRoundTrip(unittest.TestCase):
+
+    def test_to_tuple_from_tuple(self):
+        for msg in _sample_messages():
+            restored = Message.from_tuple(msg.to_tuple())
+            self.assertEqual(_normalize(restored), _normalize(msg))
+
+    def test_encode_decode(self):
+        for msg in _sample_messages():
+            decoded = Message.decode(msg.encode('msgpack'), 'msgpack')
+            self.assertEqual(_normalize(decoded), _normalize(msg))
+
+    def test_type_sent_as_number(self):
+        msg = create_vote_response(0, 5, True)
+        self.assertIsInstance(msg.to_tuple()[0], int)
+
+    def test_int_keys_in_client_command(self):
+        msg = Message(MessageType.CLIENT_REQUEST, 9, 0, {1: 'a', 2: 'b'})
+        decoded = Message.decode(msg.encode('msgpack'), 'msgpack')
+        self.assertEqual(decoded.data, {1: 'a', 2: 'b'})
+
+
+class TestHeartbeatMessages(unittest.TestCase):
+
+    def test_heartbeats_are_independent(self):
+        # 연달아 만든 하트비트가 서로의 필드를 덮어쓰지 않아야 함
+        first = create_append_entries(0, 4, 1, 1, [], 0)
+        second = create_append_entries(0, 5, 1, 1, [], 0)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.term, second.term), (4, 5))
+
+    def test_heartbeat_cache_tracks_term(self):
+        first = create_append_entries(0, 4, 1, 1, [], 0).encode('json')
+        second = create_append_entries(0, 5, 1, 1, [], 0).encode('json')
+        self.assertEqual(Message.decode(first, 'json').term, 4)
+        self.assertEqual(Message.decode(second, 'json').term, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""MetricsCollector 스레드별 버퍼 병합과 백분위 계산 테스트"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import (
+    MetricsCollector, METHOD_INSTANT, METHOD_VOTING,
+    _multi_percentile, _hist_percentile, _hist_bucket, _HIST_BUCKETS,
+)
+
+
+def _run_in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+class TestThreadBuffers(unittest.TestCase):
+
+    def test_records_from_other_threads_are_merged(self):
+        mc = MetricsCollector()
+
+        def writer():
+            mc.record_election_time(0.002, 1, True, METHOD_INSTANT)
+            mc.record_election_time(0.010, 2, False, 'voting')
+            mc.record_request_latency(0.005, True)
+            mc.record_request_latency(0.007, False)
+
+        _run_in_thread(writer)
+        summary = mc.get_summary()
+        self.assertEqual(summary['instant_promotions'], 1)
+        self.assertEqual(summary['voting_elections'], 1)
+        self.assertEqual(summary['total_requests'], 2)
+        self.assertEqual(summary['successful_requests'], 1)
+        self.assertEqual(len(mc.election_times), 2)
+
+    def test_finished_thread_buffers_are_dropped(self):
+        mc = MetricsCollector()
+        _run_in_thread(lambda: mc.record_request_latency(0.001, True))
+        _run_in_thread(lambda: mc.record_throughput(0, 10.0))
+        mc.get_summary()
+        self.assertEqual(mc._buffers, [])
+        self.assertEqual(mc._lat_shards, [])
+
+    def test_buffers_flush_without_reads(self):
+        # 조회 없이 기록만 해도 스레드 버퍼가 max_raw_samples를 넘지 않아야 함
+        mc = MetricsCollector(max_raw_samples=50)
+        for i in range(500):
+            mc.record_request_latency(0.001, True)
+            mc.record_throughput(0, float(i))
+        self.assertLess(len(mc._tls.latency[2]), 50)
+        self.assertLess(len(mc._tls.buffer), 50)
+        self.assertEqual(mc.get_summary()['total_requests'], 500)
+
+    def test_summary_cache_invalidated_by_new_records(self):
+        mc = MetricsCollector()
+        mc.record_request_latency(0.001, True)
+        self.assertEqual(mc.get_summary()['total_requests'], 1)
+        mc.record_request_latency(0.002, True)
+        self.assertEqual(mc.get_summary()['total_requests'], 2)
+
+    def test_raw_samples_bounded(self):
+        mc = MetricsCollector(max_raw_samples=100)
+        for i in range(1000):
+            mc.record_request_latency(i / 1000, True)
+        self.assertEqual(len(mc.request_latencies), 100)
+        self.assertEqual(mc.get_summary()['total_requests'], 1000)
+
+
+class TestPercentiles(unittest.TestCase):
+
+    def test_multi_percentile_matches_interpolation(self):
+        values = list(range(1, 101))
+        p50, p95, p99 = _multi_percentile(values, (50, 95, 99))
+        self.assertAlmostEqual(p50, 50.5)
+        self.assertAlmostEqual(p95, 95.05)
+        self.assertAlmostEqual(p99, 99.01)
+
+    def test_multi_percentile_tail_path(self):
+        # 상위 꼬리만 요청하면 heapq.nlargest 경로, 결과는 정렬 경로와 같아야 함
+        values = [(i * 7919) % 1000 for i in range(1000)]
+        tail = _multi_percentile(values, (99,))[0]
+        full = _multi_percentile(values, (50, 99))[1]
+        self.assertAlmostEqual(tail, full)
+
+    def test_multi_percentile_single_value(self):
+        self.assertEqual(_multi_percentile([3.0], (50, 99)), [3.0, 3.0])
+
+    def test_hist_percentile_relative_error(self):
+        hist = [0] * _HIST_BUCKETS
+        values = [i / 10000 for i in range(1, 1001)]  # 0.1ms ~ 100ms
+        for v in values:
+            hist[_hist_bucket(v)] += 1
+        approx = _hist_percentile(hist, len(values), (50, 99))
+        exact = _multi_percentile(values, (50, 99))
+        for a, e in zip(approx, exact):
+            self.assertLess(abs(a - e) / e, 0.03)
+
+    def test_summary_uses_histogram_after_ring_wraps(self):
+        mc = MetricsCollector(max_raw_samples=10)
+        for i in range(1, 101):
+            mc.record_request_latency(i / 1000, True)
+        p99 = mc.get_summary()['p99_latency_ms']
+        self.assertLess(abs(p99 - 99.01) / 99.01, 0.03)
+
+    def test_method_p99(self):
+        mc = MetricsCollector()
+        for i in range(1, 101):
+            mc.record_election_time(i / 1000, 0, False, METHOD_VOTING)
+        self.assertAlmostEqual(mc.get_summary()['p99_voting_election_ms'], 99.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""RaftNode 타이머 마감 시각과 이벤트 루프(명령 제출) 테스트"""
+
+import os
+import queue
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RaftConfig
+from node import RaftNode, NodeState
+
+
+class FakeTransport:
+    """전송 기록만 남기는 transport (네트워크 없음)"""
+
+    def __init__(self, connected=3):
+        self.recv_queue = queue.SimpleQueue()
+        self.connected = connected
+        self.sent = []
+        self.reconnects = []
+
+    def send(self, target_id, message):
+        self.sent.append((target_id, message.type))
+
+    def send_prebuilt(self, target_id, packet):
+        self.sent.append((target_id, packet))
+
+    def broadcast(self, targets, message):
+        for target_id in targets:
+            self.send(target_id, message)
+
+    def get_connected_count(self):
+        return self.connected
+
+    def reconnect(self, target_id):
+        self.reconnects.append(target_id)
+
+
+def _make_node(total_nodes=3):
+    config = RaftConfig()
+    config.debug = False
+    return RaftNode(0, total_nodes, config, FakeTransport(total_nodes))
+
+
+def _end_grace(node):
+    node.startup_grace_period = False
+
+
+class TestNextDeadline(unittest.TestCase):
+
+    def test_follower_in_startup_grace(self):
+        node = _make_node()
+        self.assertEqual(node._next_deadline(),
+                         node.startup_time + node.startup_grace_duration)
+
+    def test_follower_election_timeout(self):
+        node = _make_node()
+        _end_grace(node)
+        self.assertEqual(node._next_deadline(), node.last_heartbeat + node.election_timeout)
+
+    def test_leader(self):
+        node = _make_node()
+        _end_grace(node)
+        node._become_leader_from_election(time.monotonic())
+        self.assertEqual(node.state, NodeState.LEADER)
+        expected = min(node.last_heartbeat + node.config.heartbeat_interval,
+                       node.last_majority_ack_time + node.lease_timeout)
+        self.assertEqual(node._next_deadline(), expected)
+
+    def test_candidate_promotion_pending(self):
+        node = _make_node()
+        _end_grace(node)
+        node.is_sub_leader = True
+        node.subleader_rank = 0
+        node._instant_promotion(time.monotonic())
+        self.assertTrue(node.is_promotion_pending)
+        self.assertEqual(node._next_deadline(),
+                         node.promotion_start_time + node.config.promotion_timeout)
+
+    def test_candidate_waiting_for_votes(self):
+        node = _make_node()
+        _end_grace(node)
+        now = time.monotonic()
+        node._start_election(now)
+        self.assertEqual(node.state, NodeState.CANDIDATE)
+        deadline = node._next_deadline()
+        self.assertEqual(deadline, node.last_heartbeat + node.election_timeout)
+        self.assertGreater(deadline, now)
+
+    def test_candidate_deadline_moves_after_it_expires(self):
+        # 마감 시각이 지나면 재선거가 시작되고 마감 시각이 미래로 이동 (공회전 없음)
+        node = _make_node()
+        _end_grace(node)
+        node._start_election(time.monotonic())
+        term = node.current_term
+        deadline = node._next_deadline()
+        node._check_timers(deadline + 0.001)
+        self.assertEqual(node.current_term, term + 1)
+        self.assertGreater(node._next_deadline(), deadline)
+
+    def test_run_waits_at_least_tick_floor(self):
+        # 지난 마감 시각이 남아 있어도 대기 시간 하한 때문에 루프가 돌지 않아야 함
+        node = _make_node()
+        calls = []
+
+        def stale_deadline():
+            calls.append(1)
+            return 0.0
+
+        node._next_deadline = stale_deadline
+        thread = threading.Thread(target=node.run, daemon=True)
+        thread.start()
+        time.sleep(0.2)
+        node.stop()
+        thread.join(timeout=1.0)
+        floor = node.config.auto_tick_period
+        self.assertLess(len(calls), 0.2 / floor * 2)
+
+
+class TestSubmitCommand(unittest.TestCase):
+
+    def test_submit_through_inbox(self):
+        node = _make_node()
+        _end_grace(node)
+        node._become_leader_from_election(time.monotonic())
+        thread = threading.Thread(target=node.run, daemon=True)
+        thread.start()
+        try:
+            while node._loop_thread is None:
+                time.sleep(0.001)
+            self.assertTrue(node.submit_command({'type': 'increment', 'value': 1}))
+            self.assertEqual(node.log_commands, [{'type': 'increment', 'value': 1}])
+        finally:
+            node.stop()
+            thread.join(timeout=1.0)
+
+    def test_submit_rejected_when_not_leader(self):
+        node = _make_node()
+        self.assertFalse(node.submit_command({'type': 'increment', 'value': 1}))
+
+    def test_pending_submits_fail_on_stop(self):
+        node = _make_node()
+        future = Future()
+        node._inbox.put(('submit', {'type': 'increment', 'value': 1}, future))
+        node.running = False
+        node.run()  # 루프는 바로 끝나고 남은 제출을 실패로 응답
+        self.assertFalse(future.result(timeout=1.0))
+
+    def test_submit_after_stop(self):
+        node = _make_node()
+        node._loop_thread = threading.Thread()  # 다른 스레드가 루프를 돌던 상태
+        node.stop()
+        self.assertFalse(node.submit_command({'type': 'increment', 'value': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
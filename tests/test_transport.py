@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""TCPTransport 수신 측 프레임 재조립 테스트 (selector 리더, 큰 프레임 직접 수신)"""
+
+import os
+import socket
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RaftConfig
+from message import LogEntry, create_append_entries, create_append_ack
+from transport import TCPTransport
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _big_append_entries(count=2000):
+    """scratch 버퍼(64KB)보다 큰 AppendEntries"""
+    entries = [LogEntry(1, {'type': 'set', 'value': 'x' * 40}, i) for i in range(1, count + 1)]
+    return create_append_entries(1, 1, 0, 0, entries, 0)
+
+
+class TestFrameReassembly(unittest.TestCase):
+
+    def setUp(self):
+        self.config = RaftConfig()
+        self.config.max_message_bytes = 1024 * 1024
+        addr = f"127.0.0.1:{_free_port()}"
+        self.transport = TCPTransport(addr, [addr], self.config)
+        self.client = socket.create_connection(('127.0.0.1', self.transport.port))
+        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def tearDown(self):
+        self.client.close()
+        self.transport.stop()
+
+    def _send_in_pieces(self, data, sizes):
+        start = 0
+        for size in sizes:
+            self.client.sendall(data[start:start + size])
+            start += size
+            time.sleep(0.02)  # 리더가 조각마다 따로 읽도록
+        self.client.sendall(data[start:])
+
+    def _receive(self, count):
+        received = []
+        for _ in range(count):
+            msg = self.transport.receive(timeout=2.0)
+            self.assertIsNotNone(msg)
+            received.append(msg)
+        return received
+
+    def test_small_frames_split_across_reads(self):
+        frames = [create_append_ack(i, 1, True, i).encode('json') for i in range(3)]
+        data = b''.join(frames)
+        # 헤더 중간, 페이로드 중간, 두 프레임 경계를 가로지르는 조각
+        self._send_in_pieces(data, [2, 5, len(frames[0]) + 3])
+        received = self._receive(3)
+        self.assertEqual([m.data['match_index'] for m in received], [0, 1, 2])
+
+    def test_several_frames_in_one_read(self):
+        frames = [create_append_ack(i, 1, True, i).encode('json') for i in range(5)]
+        self.client.sendall(b''.join(frames))
+        received = self._receive(5)
+        self.assertEqual([m.sender_id for m in received], [0, 1, 2, 3, 4])
+
+    def test_large_frame_then_small_frame(self):
+        big = _big_append_entries()
+        big_frame = big.encode('json')
+        self.assertGreater(len(big_frame), 2 * 65536)
+        small_frame = create_append_ack(2, 1, True, 7).encode('json')
+        data = big_frame + small_frame
+        large_reads = []
+        read_large_frame = self.transport._read_large_frame
+
+        def counting(sock, state):
+            large_reads.append(1)
+            read_large_frame(sock, state)
+
+        self.transport._read_large_frame = counting
+        # 헤더+일부 → 큰 프레임 모드 전환, 나머지는 프레임 버퍼로 직접 수신, 뒤이은 작은 프레임
+        self._send_in_pieces(data, [100, 70000, 30000])
+        first, second = self._receive(2)
+        self.assertTrue(large_reads)
+        self.assertEqual(len(first.data['entries']), 2000)
+        self.assertEqual(first.data['entries'][-1].index, 2000)
+        self.assertEqual(second.data['match_index'], 7)
+
+    def test_oversized_frame_closes_connection(self):
+        header = (self.config.max_message_bytes + 1).to_bytes(4, 'big')
+        self.client.sendall(header + b'x' * 10)
+        self.client.settimeout(2.0)
+        self.assertEqual(self.client.recv(10), b'')
+        self.assertIsNone(self.transport.receive(timeout=0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
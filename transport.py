@@ -11,15 +11,44 @@ AWS EC2 환경에 최적화된 TCP 소켓 통신 구현
 - 논블로킹 I/O
 """
 
+import itertools
+import selectors
 import socket
 import threading
-import json
-import struct
 import time
 import queue
 from collections import defaultdict
 
-from message import Message
+try:
+    import msgpack  # 선택 의존성 (config.wire_format = 'msgpack')
+except ImportError:
+    msgpack = None
+
+from message import Message, _HDR
+
+
+# 길이 헤더 크기 (message.py의 미리 컴파일된 '>I' Struct를 그대로 사용)
+_HDR_SIZE = _HDR.size
+
+# 이 크기 이상의 페이로드는 헤더와 합치지 않고 (header, payload)로 sendmsg 전송
+_GATHER_MIN = 64 * 1024
+
+# sendmsg 미지원 플랫폼(Windows)은 합쳐서 sendall
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
+# 수신 프레임 크기 기본 상한 (config.max_message_bytes가 없을 때)
+_MAX_FRAME = 10 * 1024 * 1024
+
+# 전송 스레드가 한 번의 sendmsg로 묶어 보내는 최대 프레임 수 (IOV_MAX 1024 이내)
+_WRITE_BATCH = 64
+
+# 전송 통계 항목 (get_stats() 출력 순서)
+_STAT_NAMES = ('send_count', 'recv_count', 'send_errors', 'connect_errors', 'reconnects')
+
+# 초기 연결: 피어별 지수 백오프 범위와 전체 대기 한도 (초)
+_BOOTSTRAP_BACKOFF_MIN = 0.01
+_BOOTSTRAP_BACKOFF_MAX = 0.5
+_BOOTSTRAP_DEADLINE = 10.0
 
 
 class TCPTransport:
@@ -32,15 +61,18 @@ class TCPTransport:
     - 영구 연결 풀 관리
     """
 
-    def __init__(self, self_addr, all_addrs, config=None):
+    def __init__(self, self_addr, all_addrs, config=None, presorted=False):
         """
         Args:
             self_addr: 자신의 주소 (예: '10.0.1.10:5000')
             all_addrs: 모든 노드 주소 리스트
             config: RaftConfig 객체 (선택)
+            presorted: True면 all_addrs를 노드 ID 순서로 보고 다시 정렬하지 않음
+                       (ClusterConfig.get_all_addresses() 결과를 넘길 때)
         """
         self.self_addr = self_addr
-        self.all_addrs = sorted(all_addrs)  # 정렬하여 ID 일관성 보장
+        # 정렬하여 ID 일관성 보장
+        self.all_addrs = list(all_addrs) if presorted else sorted(all_addrs)
 
         # 주소 파싱
         self.host, self.port = self._parse_address(self_addr)
@@ -50,48 +82,111 @@ class TCPTransport:
         self.id_to_addr = {i: addr for i, addr in enumerate(self.all_addrs)}
         self.self_id = self.addr_to_id[self_addr]
 
-        # 메시지 큐 (수신용)
-        self.recv_queue = queue.Queue()
+        # 메시지 큐 (수신용, RaftNode의 이벤트 루프 inbox로도 공유)
+        # SimpleQueue는 C 구현이라 put/get에 Python 레벨 락/Condition이 없음
+        self.recv_queue = queue.SimpleQueue()
 
-        # TCP 서버
+        # TCP 서버 (수신은 selector 스레드 하나가 accept와 모든 피어 연결의 읽기를 처리)
         self.server_socket = None
+        self.selector = selectors.DefaultSelector()
+        # 수신 스레드 전용 읽기 버퍼 (스레드가 하나이므로 버퍼 하나를 계속 재사용)
+        self._recv_buf = bytearray(65536)
+        self._recv_view = memoryview(self._recv_buf)
+        # Linux는 TCP_QUICKACK을 일정 시간 뒤 다시 끄므로 수신할 때마다 재설정
+        self._quickack = (bool(getattr(config, 'tcp_quickack', True))
+                          and hasattr(socket, 'TCP_QUICKACK'))
         self.running = True
 
         # 영구 연결 풀 (target_id → socket)
-        self.connections = {}
-        self.connections_lock = threading.Lock()
+        # 피어 수가 고정이므로 노드 ID로 인덱싱하는 슬롯 배열. 살아 있는 연결 조회는 락 없이,
+        # 연결 생성/교체만 슬롯별 락으로 보호 (한 피어의 느린 재연결이 다른 피어를 막지 않음)
+        self.connections = [None] * len(self.all_addrs)
+        self.slot_locks = [threading.Lock() for _ in self.all_addrs]
 
         # 연결 재시도 추적
         self.last_connect_attempt = {}
         self.connection_errors = defaultdict(int)
 
-        # 통계
-        self.stats = {
-            'send_count': 0,
-            'recv_count': 0,
-            'send_errors': 0,
-            'connect_errors': 0,
-            'reconnects': 0
-        }
-        self.stats_lock = threading.Lock()
+        # 통계 카운터: itertools.count의 next()는 C 구현이라 GIL 아래 원자적이므로
+        # 증가할 때 락이 필요 없음. 값은 get_stats()가 next()로 읽음 (_counter_reads 보정)
+        self._counters = {name: itertools.count() for name in _STAT_NAMES}
+        self._counter_reads = dict.fromkeys(_STAT_NAMES, 0)  # 읽느라 소비한 값 수
+        self.stats_lock = threading.Lock()  # get_stats() 읽기끼리만 직렬화
+        self._count_send = self._counters['send_count'].__next__
+        self._count_recv = self._counters['recv_count'].__next__
 
         # 설정
+        self.config = config
         self.connect_timeout = 2.0  # 연결 타임아웃 (2초)
         self.send_timeout = 1.0  # 전송 타임아웃 (1초)
         self.retry_interval = 1.0  # 재시도 간격 (1초)
 
+        # 직렬화 포맷 (클러스터의 모든 노드가 같은 값을 써야 함)
+        self.wire_format = getattr(config, 'wire_format', 'json') if config else 'json'
+        if self.wire_format == 'msgpack' and msgpack is None:
+            raise RuntimeError("wire_format='msgpack'을 사용하려면 msgpack 패키지가 필요합니다")
+
+        # 수신 프레임 크기 상한: 길이 헤더만 보고 넘으면 버퍼를 할당하기 전에 연결을 닫음
+        self.max_frame = getattr(config, 'max_message_bytes', _MAX_FRAME) if config else _MAX_FRAME
+
         print(f"[TCP Node {self.self_id}] Initializing transport: {self_addr}")
 
         # 서버 시작
         self._start_server()
 
-        # 다른 노드들이 서버 시작할 시간 대기
-        print(f"[TCP Node {self.self_id}] Waiting for other nodes to start...")
-        time.sleep(5.0)  # 5초 대기 (네트워크 안정화)
-
-        # 모든 노드에 초기 연결 시도
+        # 모든 노드에 초기 연결 시도 (아직 시작하지 않은 피어는 백오프로 재시도)
         self._initial_connections()
 
+        # 피어별 송신 큐 + 전송 스레드: send()는 큐에 넣고 바로 반환하므로
+        # 느린 팔로워의 송신 버퍼가 차도 다른 팔로워 전송이 막히지 않는다
+        self.send_queues = {}
+        self.writer_threads = []
+        for target_id in range(len(self.all_addrs)):
+            if target_id != self.self_id:
+                q = queue.SimpleQueue()
+                self.send_queues[target_id] = q
+                t = threading.Thread(target=self._writer_loop, args=(target_id, q), daemon=True)
+                t.start()
+                self.writer_threads.append(t)
+
+    def _configure_socket(self, sock):
+        """
+        피어 소켓 옵션 적용 (RaftConfig의 소켓 설정)
+
+        TCP_QUICKACK, TCP_USER_TIMEOUT은 Linux 전용이라 없는 플랫폼에서는 건너뜀
+        """
+        config = self.config
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if getattr(config, 'tcp_nodelay', True):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self._set_buffer_sizes(sock)
+
+        try:
+            if getattr(config, 'tcp_quickack', True) and hasattr(socket, 'TCP_QUICKACK'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            user_timeout = getattr(config, 'tcp_user_timeout_ms', 0)
+            if user_timeout > 0 and hasattr(socket, 'TCP_USER_TIMEOUT'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, user_timeout)
+        except OSError:
+            pass
+
+    def _set_buffer_sizes(self, sock):
+        """
+        송수신 버퍼 크기 적용 (so_sndbuf/so_rcvbuf, 0이면 socket_buffer_bytes, 둘 다 0이면 OS 기본값)
+
+        윈도우 스케일은 연결 수립 시 정해지므로 connect/listen 전에 호출해야 함
+        (accept된 소켓은 리슨 소켓의 설정을 물려받음)
+        """
+        config = self.config
+        default = getattr(config, 'socket_buffer_bytes', 0)
+        sndbuf = getattr(config, 'so_sndbuf', 0) or default
+        if sndbuf > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+        rcvbuf = getattr(config, 'so_rcvbuf', 0) or default
+        if rcvbuf > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+
     def _parse_address(self, addr):
         """주소 파싱: '10.0.1.10:5000' → ('10.0.1.10', 5000)"""
         parts = addr.split(':')
@@ -105,161 +200,245 @@ class TCPTransport:
 
             # Keep-alive 설정
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # 버퍼 크기는 listen 전에 설정해야 accept된 연결의 윈도우 스케일에 반영됨
+            self._set_buffer_sizes(self.server_socket)
 
             # 바인딩 (0.0.0.0으로 모든 인터페이스 수신)
             self.server_socket.bind(('0.0.0.0', self.port))
             self.server_socket.listen(20)
-            self.server_socket.settimeout(1.0)
+            self.server_socket.setblocking(False)
+            self.selector.register(self.server_socket, selectors.EVENT_READ, None)
 
             print(f"[TCP Node {self.self_id}] Server listening on 0.0.0.0:{self.port}")
 
-            # Accept 스레드 시작
-            accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
-            accept_thread.start()
+            # 수신 스레드 시작
+            reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+            reader_thread.start()
 
         except Exception as e:
             print(f"[TCP Node {self.self_id}] ERROR: Failed to start server: {e}")
             raise
 
-    def _accept_loop(self):
-        """클라이언트 연결 수락 루프"""
-        while self.running:
-            try:
-                client_sock, addr = self.server_socket.accept()
-                client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-
-                # 각 연결마다 별도 스레드에서 처리
-                handler = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_sock, addr),
-                    daemon=True
-                )
-                handler.start()
-
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    print(f"[TCP Node {self.self_id}] Accept error: {e}")
-
-    def _handle_client(self, client_sock, addr):
-        """클라이언트 연결 처리 (수신 루프)"""
-        client_sock.settimeout(30.0)  # 30초 수신 타임아웃
+    def _reader_loop(self):
+        """
+        수신 루프 (단일 스레드)
 
+        리슨 소켓(data=None)이 준비되면 accept, 피어 연결이 준비되면
+        읽은 바이트를 연결별 버퍼에 붙이고 완성된 프레임을 디코딩한다.
+        """
+        selector = self.selector
         try:
             while self.running:
-                # 메시지 길이 수신 (4 bytes)
-                length_data = self._recv_exact(client_sock, 4)
-                if not length_data:
-                    break
+                for key, _ in selector.select(timeout=1.0):
+                    if key.data is None:
+                        self._accept()
+                    else:
+                        self._on_readable(key)
+        except Exception as e:
+            if self.running:
+                print(f"[TCP Node {self.self_id}] Reader error: {e}")
+        finally:
+            for key in list(selector.get_map().values()):
+                if key.data is not None:
+                    try:
+                        key.fileobj.close()
+                    except:
+                        pass
+            selector.close()
 
-                msg_length = struct.unpack('>I', length_data)[0]
-                if msg_length > 10 * 1024 * 1024:  # 10MB 제한
+    def _accept(self):
+        """클라이언트 연결 수락 후 selector에 등록 (연결별 수신 버퍼 포함)"""
+        try:
+            client_sock, addr = self.server_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            if self.running:
+                print(f"[TCP Node {self.self_id}] Accept error: {e}")
+            return
+        self._configure_socket(client_sock)
+        client_sock.setblocking(False)
+        self.selector.register(client_sock, selectors.EVENT_READ, bytearray())
+
+    def _close_client(self, sock):
+        """수신 연결 정리"""
+        try:
+            self.selector.unregister(sock)
+        except Exception:
+            pass
+        try:
+            sock.close()
+        except:
+            pass
+
+    def _on_readable(self, key):
+        """읽을 수 있는 연결 처리: 버퍼에 붙이고 완성된 길이 프레임을 모두 전달"""
+        sock = key.fileobj
+        buf = key.data
+        if buf.__class__ is list:
+            self._read_large_frame(sock, buf)
+            return
+        try:
+            # 미리 할당한 버퍼로 읽어 recv마다 bytes 객체를 만들지 않음
+            n = sock.recv_into(self._recv_buf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close_client(sock)
+            return
+        if not n:
+            self._close_client(sock)  # 피어가 연결을 닫음
+            return
+        if self._quickack:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            except OSError:
+                pass
+        buf += self._recv_view[:n]
+
+        # 프레임 파싱 (memoryview는 버퍼 크기를 바꾸기 전에 모두 해제)
+        offset = 0
+        end = len(buf)
+        too_large = False
+        large = None
+        max_frame = self.max_frame
+        with memoryview(buf) as mv:
+            while end - offset >= _HDR_SIZE:
+                msg_length = _HDR.unpack_from(mv, offset)[0]
+                if msg_length > max_frame:
                     print(f"[TCP Node {self.self_id}] Message too large: {msg_length}")
+                    too_large = True
                     break
-
-                # 메시지 데이터 수신
-                msg_data = self._recv_exact(client_sock, msg_length)
-                if not msg_data:
+                if end - offset - _HDR_SIZE < msg_length:
+                    if msg_length > len(self._recv_buf):
+                        # 큰 프레임: 전체 크기로 한 번만 할당하고 나머지는 그 자리로 직접 수신
+                        large = bytearray(msg_length)
+                        got = end - offset - _HDR_SIZE
+                        large[:got] = mv[offset + _HDR_SIZE:end]
+                        offset = end
                     break
-
-                # 역직렬화
-                try:
-                    json_data = msg_data.decode('utf-8')
-                    msg_dict = json.loads(json_data)
-                    msg = Message.from_dict(msg_dict)
-
-                    # 큐에 추가
-                    self.recv_queue.put(msg)
-                    with self.stats_lock:
-                        self.stats['recv_count'] += 1
-
-                except Exception as e:
-                    print(f"[TCP Node {self.self_id}] Deserialize error: {e}")
-
-        except socket.timeout:
-            pass  # 타임아웃, 정상
-        except Exception as e:
-            if self.running:
-                pass  # 연결 종료
-        finally:
+                start = offset + _HDR_SIZE
+                offset = start + msg_length
+                with mv[start:offset] as payload:
+                    self._deliver(payload)
+        if too_large:
+            self._close_client(sock)
+            return
+        if offset:
+            del buf[:offset]
+        if large is not None:
+            self.selector.modify(sock, selectors.EVENT_READ, [memoryview(large), got])
+
+    def _read_large_frame(self, sock, state):
+        """큰 프레임 수신: 프레임 버퍼에 recv_into로 바로 채우고 다 차면 전달"""
+        view, got = state
+        try:
+            n = sock.recv_into(view[got:])
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            view.release()
+            self._close_client(sock)
+            return
+        if not n:
+            view.release()
+            self._close_client(sock)
+            return
+        if self._quickack:
             try:
-                client_sock.close()
-            except:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            except OSError:
                 pass
+        got += n
+        if got < len(view):
+            state[1] = got
+            return
+        # 프레임 완성: 일반 버퍼 모드로 복귀 (다음 프레임 헤더부터 다시 읽음)
+        self.selector.modify(sock, selectors.EVENT_READ, bytearray())
+        self._deliver(view)
+        view.release()
+
+    def _deliver(self, payload):
+        """프레임 하나를 디코딩해서 수신 큐에 넣음"""
+        # 역직렬화 (wire_format에 따라 JSON 또는 msgpack)
+        try:
+            msg = Message.decode_payload(payload, self.wire_format)
+            self.recv_queue.put(msg)
+            self._count_recv()
 
-    def _recv_exact(self, sock, n):
-        """정확히 n 바이트 수신"""
-        data = b''
-        while len(data) < n:
-            try:
-                chunk = sock.recv(n - len(data))
-                if not chunk:
-                    return None
-                data += chunk
-            except socket.timeout:
-                return None
-            except Exception:
-                return None
-        return data
+        except Exception as e:
+            print(f"[TCP Node {self.self_id}] Deserialize error: {e}")
 
     def _initial_connections(self):
-        """초기 연결 설정"""
+        """
+        초기 연결 설정
+
+        고정 대기 없이 바로 연결을 시도하고, 실패한 피어는 피어별 지수 백오프
+        (10ms, 20ms, 40ms, ... 최대 500ms)로 재시도한다. 모두 연결되거나
+        _BOOTSTRAP_DEADLINE이 지나면 반환 (남은 피어는 전송 시 재연결).
+        """
         print(f"[TCP Node {self.self_id}] Establishing initial connections...")
 
-        # 5회 시도, 각 시도 사이 1초 대기 (안정적 연결 확보)
-        for attempt in range(5):
-            for target_id in range(len(self.all_addrs)):
-                if target_id != self.self_id:
-                    self._ensure_connection(target_id)
-            # 모든 연결 완료 시 조기 종료
-            connected = len([k for k in self.connections.keys()])
-            if connected >= len(self.all_addrs) - 1:
+        start = time.monotonic()
+        deadline = start + _BOOTSTRAP_DEADLINE
+        pending = {i for i in range(len(self.all_addrs)) if i != self.self_id}
+        delay = dict.fromkeys(pending, _BOOTSTRAP_BACKOFF_MIN)
+        next_try = dict.fromkeys(pending, start)
+
+        while pending and self.running:
+            now = time.monotonic()
+            if now >= deadline:
                 break
-            time.sleep(1.0)
+            for target_id in list(pending):
+                if now < next_try[target_id]:
+                    continue
+                if self._ensure_connection(target_id, force=True):
+                    pending.discard(target_id)
+                else:
+                    delay[target_id] = min(delay[target_id] * 2, _BOOTSTRAP_BACKOFF_MAX)
+                    next_try[target_id] = time.monotonic() + delay[target_id]
+            if pending:
+                wait = min(next_try[i] for i in pending) - time.monotonic()
+                if wait > 0:
+                    time.sleep(min(wait, max(0.0, deadline - time.monotonic())))
 
         # 연결 상태 출력
-        connected = len([k for k in self.connections.keys()])
+        connected = self._open_count()
         total = len(self.all_addrs) - 1
-        print(f"[TCP Node {self.self_id}] Initial connections: {connected}/{total}")
-
-    def _ensure_connection(self, target_id):
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if connected >= total:
+            print(f"[TCP Node {self.self_id}] Ready: all {total} peers connected in {elapsed_ms:.0f}ms")
+        else:
+            print(f"[TCP Node {self.self_id}] Initial connections: {connected}/{total} "
+                  f"after {elapsed_ms:.0f}ms")
+
+    def _ensure_connection(self, target_id, force=False):
         """
         타겟 노드에 대한 연결 확보
 
+        Args:
+            force: True면 재연결 간격(retry_interval) 제한 없이 바로 연결 시도 (초기 연결용)
+
         Returns:
             socket 또는 None
         """
-        with self.connections_lock:
-            # 기존 연결 확인
-            if target_id in self.connections:
-                sock = self.connections[target_id]
-                try:
-                    # 연결 유효성 검사
-                    sock.setblocking(False)
-                    try:
-                        sock.recv(1, socket.MSG_PEEK)
-                    except BlockingIOError:
-                        pass  # 데이터 없음, 정상
-                    except Exception:
-                        raise Exception("Connection invalid")
-                    sock.setblocking(True)
-                    return sock
-                except:
-                    # 연결 끊어짐
-                    try:
-                        sock.close()
-                    except:
-                        pass
-                    del self.connections[target_id]
-                    with self.stats_lock:
-                        self.stats['reconnects'] += 1
+        # 빠른 경로: 기존 연결은 락 없이 조회해서 바로 반환 (슬롯을 쓰는 전송 스레드는 피어당 하나)
+        # 끊어진 연결은 _write의 sendall 예외로, 응답 없는 연결은 RaftNode의
+        # 미응답 하트비트 검사(reconnect)로 정리되므로 여기서 커널 호출로 확인하지 않음
+        sock = self.connections[target_id]
+        if sock is not None:
+            return sock
+
+        with self.slot_locks[target_id]:
+            # 다른 스레드가 먼저 연결했으면 그대로 사용
+            sock = self.connections[target_id]
+            if sock is not None:
+                return sock
 
             # 재연결 간격 확인
             now = time.time()
             last_attempt = self.last_connect_attempt.get(target_id, 0)
-            if now - last_attempt < self.retry_interval:
+            if not force and now - last_attempt < self.retry_interval:
                 return None
 
             self.last_connect_attempt[target_id] = now
@@ -272,8 +451,7 @@ class TCPTransport:
             try:
                 host, port = self._parse_address(target_addr)
                 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._configure_socket(sock)
                 sock.settimeout(self.connect_timeout)
                 sock.connect((host, port))
                 sock.settimeout(self.send_timeout)
@@ -286,8 +464,7 @@ class TCPTransport:
 
             except Exception as e:
                 self.connection_errors[target_id] += 1
-                with self.stats_lock:
-                    self.stats['connect_errors'] += 1
+                next(self._counters['connect_errors'])
 
                 # 처음 몇 번만 에러 출력
                 if self.connection_errors[target_id] <= 2:
@@ -295,6 +472,27 @@ class TCPTransport:
 
                 return None
 
+    def _drop_connection(self, target_id, sock):
+        """
+        슬롯의 연결이 아직 sock이면 비우고 닫음
+
+        Returns:
+            슬롯에서 제거했으면 True (이미 다른 연결로 교체됐으면 False)
+        """
+        with self.slot_locks[target_id]:
+            if self.connections[target_id] is not sock:
+                return False
+            self.connections[target_id] = None
+        try:
+            sock.close()
+        except:
+            pass
+        return True
+
+    def _open_count(self):
+        """슬롯에 연결이 있는 피어 수"""
+        return sum(1 for sock in self.connections if sock is not None)
+
     def send(self, target_id, message):
         """
         메시지 전송
@@ -308,45 +506,147 @@ class TCPTransport:
             self.recv_queue.put(message)
             return
 
-        if target_id < 0 or target_id >= len(self.all_addrs):
+        try:
+            # 메시지 직렬화 (하트비트는 캐시된 프레임 재사용,
+            # 큰 메시지는 헤더/페이로드를 합치지 않고 그대로 전송)
+            if message.heartbeat or message._frame is not None:
+                packet = message.encode(self.wire_format)
+            else:
+                header, body = message.encode_parts(self.wire_format)
+                packet = (header, body) if len(body) >= _GATHER_MIN else header + body
+        except Exception as e:
+            print(f"[TCP Node {self.self_id}] Serialize error: {e}")
+            next(self._counters['send_errors'])
+            return
+
+        self.send_prebuilt(target_id, packet)
+
+    def broadcast(self, targets, message):
+        """
+        같은 메시지를 여러 노드에 전송 (직렬화는 한 번, 피어별 송신 큐에 같은 프레임)
+
+        Args:
+            targets: 대상 노드 ID 목록
+            message: Message 객체
+        """
+        try:
+            packet = message.encode(self.wire_format)
+        except Exception as e:
+            print(f"[TCP Node {self.self_id}] Serialize error: {e}")
+            next(self._counters['send_errors'])
+            return
+
+        for target_id in targets:
+            self.send_prebuilt(target_id, packet)
+
+    def send_prebuilt(self, target_id, packet):
+        """
+        미리 인코딩된 프레임 전송 (피어 송신 큐에 넣고 바로 반환)
+
+        리더가 같은 AppendEntries를 여러 팔로워에게 보낼 때 한 번만 인코딩하고
+        바이트를 재사용한다. 실제 sendall은 피어별 전송 스레드가 순서대로 수행.
+
+        Args:
+            target_id: 대상 노드 ID
+            packet: Message.encode(wire_format) 결과 (길이 헤더 포함)
+                    또는 Message.encode_parts(wire_format)의 (header, payload) 쌍
+        """
+        if target_id == self.self_id:
+            if isinstance(packet, tuple):
+                packet = b''.join(packet)
+            self.recv_queue.put(Message.decode(packet, self.wire_format))
+            return
+
+        q = self.send_queues.get(target_id)
+        if q is None:
             print(f"[TCP Node {self.self_id}] Invalid target_id: {target_id}")
             return
+        q.put(packet)
 
+    def _writer_loop(self, target_id, q):
+        """
+        피어 하나의 전송 스레드 (큐에 들어온 프레임을 순서대로 전송, None이면 종료)
+
+        전송 중에 쌓인 프레임은 최대 _WRITE_BATCH개까지 꺼내 한 번의 sendmsg로
+        보낸다 (느린 피어에 밀린 프레임을 시스템 콜 하나로 파이프라이닝).
+        묶인 프레임은 커널이 한 번에 세그먼트로 나누므로 TCP_CORK/MSG_MORE와 같은
+        효과이고, 코르크 설정/해제 setsockopt 두 번이 더 들지 않는다.
+        """
+        get_nowait = q.get_nowait
+        while self.running:
+            packet = q.get()
+            if packet is None:
+                break
+            parts = None
+            count = 1
+            stop = False
+            while count < _WRITE_BATCH:
+                try:
+                    more = get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                if parts is None:
+                    parts = list(packet) if packet.__class__ is tuple else [packet]
+                if more.__class__ is tuple:
+                    parts.extend(more)
+                else:
+                    parts.append(more)
+                count += 1
+            if parts is not None:
+                packet = tuple(parts)
+            self._write(target_id, packet, count)
+            if stop:
+                break
+
+    def _write(self, target_id, packet, count=1):
+        """프레임 전송 (blocking sendall, 실패 시 재연결 후 1회 재시도, count는 묶인 프레임 수)"""
+        connections = self.connections
         # 재시도 로직
         for attempt in range(2):
-            sock = self._ensure_connection(target_id)
-            if not sock:
-                continue
+            # 연결된 상태면 슬롯을 직접 읽음 (메서드 호출 없이 리스트 인덱싱 한 번)
+            sock = connections[target_id]
+            if sock is None:
+                sock = self._ensure_connection(target_id)
+                if not sock:
+                    continue
 
             try:
-                # 메시지 직렬화
-                json_data = json.dumps(message.to_dict()).encode('utf-8')
-                length = len(json_data)
-                packet = struct.pack('>I', length) + json_data
-
-                # 전송
-                sock.sendall(packet)
-                with self.stats_lock:
-                    self.stats['send_count'] += 1
+                if packet.__class__ is tuple:
+                    self._send_parts(sock, packet)
+                else:
+                    sock.sendall(packet)
+                for _ in range(count):
+                    self._count_send()
                 return  # 성공
 
             except Exception as e:
                 # 연결 제거
-                with self.connections_lock:
-                    if target_id in self.connections:
-                        try:
-                            self.connections[target_id].close()
-                        except:
-                            pass
-                        del self.connections[target_id]
+                self._drop_connection(target_id, sock)
 
-                with self.stats_lock:
-                    self.stats['send_errors'] += 1
+                next(self._counters['send_errors'])
 
         # 모든 시도 실패
         if self.connection_errors.get(target_id, 0) <= 3:
             pass  # 로그 스팸 방지
 
+    @staticmethod
+    def _send_parts(sock, parts):
+        """여러 버퍼를 복사 없이 전송 (sendmsg, 부분 전송이면 남은 부분부터 다시)"""
+        if not _HAS_SENDMSG:
+            sock.sendall(b''.join(parts))
+            return
+        views = [memoryview(p) for p in parts]
+        while views:
+            sent = sock.sendmsg(views)
+            while views and sent >= views[0].nbytes:
+                sent -= views[0].nbytes
+                views.pop(0)
+            if sent:
+                views[0] = views[0][sent:]
+
     def receive(self, node_id=None, timeout=0.01):
         """
         메시지 수신
@@ -366,35 +666,43 @@ class TCPTransport:
     def get_stats(self):
         """통계 반환"""
         with self.stats_lock:
-            return dict(self.stats)
+            stats = {}
+            for name, counter in self._counters.items():
+                reads = self._counter_reads[name]
+                stats[name] = next(counter) - reads
+                self._counter_reads[name] = reads + 1
+            return stats
+
+    def reconnect(self, target_id):
+        """
+        타겟 노드 연결 강제 종료 (다음 전송 때 _ensure_connection이 새로 연결)
+
+        응답 없는 피어의 반쯤 열린 연결에 계속 쓰지 않도록 RaftNode가 호출.
+        """
+        sock = self.connections[target_id]
+        if sock is None or not self._drop_connection(target_id, sock):
+            return
+        next(self._counters['reconnects'])
 
     def get_connected_count(self):
         """현재 연결된 노드 수 반환 (자신 포함)"""
-        with self.connections_lock:
-            # 활성 연결만 카운트
-            active_count = 0
-            for target_id, sock in list(self.connections.items()):
-                try:
-                    # 소켓이 유효한지 간단히 체크
-                    sock.getpeername()
-                    active_count += 1
-                except:
-                    pass
-            return active_count + 1  # 자신 포함
+        # 슬롯이 곧 연결 상태: 실패한 연결은 _drop_connection이 비우므로
+        # 소켓마다 getpeername() 시스템 콜로 확인하지 않음
+        return self._open_count() + 1
 
     def stop(self):
         """전송 중지"""
         print(f"[TCP Node {self.self_id}] Stopping transport...")
         self.running = False
 
+        # 전송 스레드 종료 (대기 중인 큐를 깨움)
+        for q in self.send_queues.values():
+            q.put(None)
+
         # 모든 연결 닫기
-        with self.connections_lock:
-            for sock in self.connections.values():
-                try:
-                    sock.close()
-                except:
-                    pass
-            self.connections.clear()
+        for target_id, sock in enumerate(self.connections):
+            if sock is not None:
+                self._drop_connection(target_id, sock)
 
         # 서버 소켓 닫기
         if self.server_socket:
@@ -405,3 +713,4 @@ class TCPTransport:
 
         stats = self.get_stats()
         print(f"[TCP Node {self.self_id}] Transport stopped. Stats: {stats}")
+